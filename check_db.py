@@ -11,8 +11,14 @@ console = Console()
 
 def check_db_state():
     """Check and report on database state."""
+    # One connection serves the schema reflection and every query below
+    with db.engine.connect() as conn:
+        report_db_state(conn)
+
+def report_db_state(conn):
+    """Report schema, row counts and vector settings over an open connection."""
     # Get inspector
-    inspector = inspect(db.engine)
+    inspector = inspect(conn)
 
     # Get all table names
     table_names = inspector.get_table_names()
@@ -45,37 +51,47 @@ def check_db_state():
     counts_table.add_column("Table", style="cyan")
     counts_table.add_column("Row Count", style="green", justify="right")
     
-    with db.engine.connect() as conn:
-        for table in table_names:
-            result = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() or 0
-            counts_table.add_row(table, str(result))
+    # Count every table in a single round-trip
+    quote = conn.dialect.identifier_preparer.quote
+    counts_sql = " UNION ALL ".join(
+        f"SELECT :name_{i} AS name, COUNT(*) AS n FROM {quote(table)}"
+        for i, table in enumerate(table_names)
+    )
+    params = {f"name_{i}": table for i, table in enumerate(table_names)}
+    for name, count in conn.execute(text(counts_sql), params):
+        counts_table.add_row(name, str(count or 0))
     
     console.print(counts_table)
     
     # Check vector dimensions for code_embeddings
     if 'code_embeddings' in table_names:
         console.print("\n[cyan]Vector Embedding Details:[/cyan]")
-        with db.engine.connect() as conn:
-            # Check if there are any embeddings
-            result = conn.execute(text(
-                "SELECT embedding FROM code_embeddings LIMIT 1"
-            )).first()
-            
-            if result:
-                vector = result[0]
-                console.print(f"[green]✓ Vector dimension:[/green] {len(vector)}")
-            else:
-                console.print("[yellow]No embeddings found to check dimensions[/yellow]")
-            
-            # Check pgvector extension
-            result = conn.execute(text(
-                "SELECT installed_version FROM pg_available_extensions WHERE name = 'vector'"
-            )).first()
-            
-            if result:
-                console.print(f"[green]✓ pgvector extension:[/green] version {result[0]}")
-            else:
-                console.print("[red]✗ pgvector extension not available[/red]")
+        # pgvector stores the declared dimension in atttypmod, so no row has to be read
+        dimension = conn.execute(text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = 'code_embeddings'::regclass AND attname = 'embedding'"
+        )).scalar()
+        
+        if dimension is None or dimension < 0:
+            # Column has no declared dimension, measure a stored vector instead
+            dimension = conn.execute(text(
+                "SELECT vector_dims(embedding) FROM code_embeddings LIMIT 1"
+            )).scalar()
+        
+        if dimension:
+            console.print(f"[green]✓ Vector dimension:[/green] {dimension}")
+        else:
+            console.print("[yellow]No embeddings found to check dimensions[/yellow]")
+        
+        # Check pgvector extension
+        result = conn.execute(text(
+            "SELECT installed_version FROM pg_available_extensions WHERE name = 'vector'"
+        )).first()
+        
+        if result:
+            console.print(f"[green]✓ pgvector extension:[/green] version {result[0]}")
+        else:
+            console.print("[red]✗ pgvector extension not available[/red]")
 
 if __name__ == '__main__':
     check_db_state()
@@ -15,20 +15,30 @@ def main():
     
     # Get all constructs
     with db.Session() as session:
+        # The planner's row estimate is a catalog lookup; COUNT(*) scans the table
+        # and is only needed when the table has never been analyzed
+        total = session.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = 'code_embeddings'::regclass"
+        )).scalar()
+        if total is None or total < 0:
+            total = session.execute(text("SELECT COUNT(*) FROM code_embeddings")).scalar() or 0
+            print(f"Found {total} constructs:")
+        else:
+            print(f"Found about {total} constructs:")
+        
+        # LENGTH(code) is computed server-side so the code itself never leaves the database.
+        # stream_results uses a server-side cursor so only one batch of rows is held in memory.
         result = session.execute(text("""
             SELECT name, construct_type, line_start, line_end, 
                    LENGTH(code) as code_length, description
             FROM code_embeddings 
             ORDER BY line_start
-        """))
-        
-        constructs = result.fetchall()
+        """), execution_options={"stream_results": True})
         
-    print(f"Found {len(constructs)} constructs:")
-    for construct in constructs:
-        print(f"  - {construct[0]} ({construct[1]}) lines {construct[2]}-{construct[3]} ({construct[4]} chars)")
-        print(f"    Description: {construct[5]}")
-        print()
+        for construct in result.yield_per(1000):
+            print(f"  - {construct[0]} ({construct[1]}) lines {construct[2]}-{construct[3]} ({construct[4]} chars)")
+            print(f"    Description: {construct[5]}")
+            print()
 
 if __name__ == "__main__":
     main()
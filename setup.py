@@ -10,11 +10,9 @@ setup(
     },
     include_package_data=True,
     install_requires=[
-        "gitpython>=3.1.42",
         "pydantic>=2.5.3",
         "tree-sitter>=0.20.4",
         "tree-sitter-languages>=1.10.2",
-        "pymongo>=4.6.1",
         "python-dotenv>=1.0.0",
         "google-generativeai>=0.3.2",
         "psycopg2-binary>=2.9.9",
@@ -24,6 +22,8 @@ setup(
         "beautifulsoup4>=4.12.0",
         "requests>=2.31.0",
         "markdown>=3.4.0",
+        "orjson>=3.9.0",
+        "numpy>=1.24.0",
     ],
     entry_points={
         "console_scripts": [
@@ -35,6 +35,6 @@ setup(
         ],
     },
     author="David Arnold",
-    description="A tool for embedding code constructs with Gemini and storing them in MongoDB",
+    description="A tool for embedding code constructs with Gemini and storing them in PostgreSQL",
     python_requires=">=3.8",
 )
@@ -1,14 +1,36 @@
 """Embedding generation and semantic code search system."""
 
-from .embedding import EmbeddingGenerator
-from .database_manager import DatabaseManager
-from .processors import get_processor, list_processors, register_processor
-from .processors.base import BaseProcessor
-from .models import CodeConstruct, Import
+import importlib
+
+# Public names and the submodule defining each. They are imported on first
+# access (PEP 562) so CLI entry points only load the Gemini client,
+# SQLAlchemy and tree-sitter when a command actually needs them.
+_EXPORTS = {
+    'EmbeddingGenerator': '.embedding',
+    'DatabaseManager': '.database_manager',
+    'get_processor': '.processors',
+    'list_processors': '.processors',
+    'register_processor': '.processors',
+    'BaseProcessor': '.processors.base',
+    'CodeConstruct': '.models',
+    'Import': '.models',
+}
 
 # For backward compatibility
-WebProcessor = get_processor('web')
-LocalFileProcessor = get_processor('local')
+_PROCESSOR_ALIASES = {
+    'WebProcessor': 'web',
+    'LocalFileProcessor': 'local',
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    elif name in _PROCESSOR_ALIASES:
+        value = importlib.import_module('.processors', __name__).get_processor(_PROCESSOR_ALIASES[name])
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 __all__ = [
     'EmbeddingGenerator',
@@ -0,0 +1,6 @@
+"""Rich console shared by the CLI tools and library modules."""
+
+from rich.console import Console
+
+# Creating a Console probes the terminal, so do it once per process
+console = Console()
@@ -1,8 +1,22 @@
 """CLI module for the embd package."""
 
-from .base import ProcessorCLI
-from .repo import main as repo_main
-from .web import main as web_main
-from .search import main as search_main
+import importlib
+
+# Each command is imported on first access (PEP 562), so running one entry
+# point does not load the modules and dependencies of the others
+_EXPORTS = {
+    'ProcessorCLI': ('.base', 'ProcessorCLI'),
+    'repo_main': ('.repo', 'main'),
+    'web_main': ('.web', 'main'),
+    'search_main': ('.search', 'main'),
+}
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _EXPORTS[name]
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
 
 __all__ = ['ProcessorCLI', 'repo_main', 'web_main', 'search_main']
@@ -1,12 +1,32 @@
 """Base classes for processor CLI tools."""
 
 import click
-from typing import Optional
-import json
-from rich.console import Console
-from ..database_manager import DatabaseManager
-from ..embedding import EmbeddingGenerator
-from ..processors import get_processor
+from typing import Any, Iterable, Optional, TYPE_CHECKING
+import orjson
+from .._console import console
+
+if TYPE_CHECKING:
+    from ..database_manager import DatabaseManager
+
+def write_json_records(output_file: str, records: Iterable[Any]) -> None:
+    """Write records as an indented JSON array, one record at a time.
+    
+    The output matches orjson.dumps(list(records), option=OPT_INDENT_2), but
+    only one serialized record is held in memory at once.
+    
+    Args:
+        output_file: Path of the JSON file to write
+        records: JSON-serializable records, typically a generator
+    """
+    with open(output_file, 'wb') as f:
+        f.write(b"[")
+        separator = b"\n  "
+        for record in records:
+            # orjson escapes newlines inside strings, so every raw newline is
+            # indentation and can be shifted one level for the enclosing array
+            f.write(separator + orjson.dumps(record, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+            separator = b",\n  "
+        f.write(b"]" if separator == b"\n  " else b"\n]")
 
 class ProcessorCLI:
     """Base class for processor CLI tools."""
@@ -18,8 +38,27 @@ class ProcessorCLI:
             processor_name: Name of the registered processor to use
         """
         self.processor_name = processor_name
-        self.console = Console()
-        self.processor_class = get_processor(processor_name)
+        self.console = console
+        self._db_manager: Optional["DatabaseManager"] = None
+        
+    @property
+    def processor_class(self):
+        """Registered processor class, imported on first use."""
+        from ..processors import get_processor
+        return get_processor(self.processor_name)
+        
+    @property
+    def db_manager(self) -> "DatabaseManager":
+        """Database manager shared by every command run through this CLI.
+        
+        Created and initialized on first use so repeated saves in the same
+        process reuse one engine and its connection pool.
+        """
+        if self._db_manager is None:
+            from ..database_manager import DatabaseManager
+            self._db_manager = DatabaseManager()
+            self._db_manager.init_db()
+        return self._db_manager
         
     def create_processor(self, **kwargs):
         """Create processor instance with given arguments.
@@ -31,37 +70,23 @@ class ProcessorCLI:
                      - include_patterns: List of glob patterns to include
                      - exclude_patterns: List of glob patterns to exclude
         """
-        embedding_gen = EmbeddingGenerator()
-        return self.processor_class(embedding_generator=embedding_gen, **kwargs)
+        # The processor creates its embedding generator when it first needs one
+        return self.processor_class(**kwargs)
         
-    def save_results(self, constructs, db_manager: DatabaseManager) -> None:
-        """Save constructs to database."""
-        try:
-            self.console.print("[bold cyan]Saving results to database...[/bold cyan]")
-            print(f"DEBUG: About to save {len(constructs)} constructs:")
-            for i, (construct, _) in enumerate(constructs):
-                print(f"  {i+1}. {construct.name} ({construct.construct_type}) lines {construct.line_start}-{construct.line_end}")
-            db_manager.store_constructs(constructs, show_progress=False)
-            self.console.print("[bold green]Results saved successfully![/bold green]")
-        except Exception as e:
-            self.console.print(f"[bold red]Error saving results: {str(e)}[/bold red]")
-            raise click.Abort()
-            
     def export_results(self, constructs, output_file: str) -> None:
         """Export results to JSON file."""
         try:
             self.console.print(f"[bold cyan]Exporting results to {output_file}...[/bold cyan]")
-            results = []
-            for construct, _ in constructs:
-                results.append({
+            results = (
+                {
                     "type": construct.construct_type,
                     "name": construct.name,
                     "filename": construct.filename,
                     "description": construct.description
-                })
-            
-            with open(output_file, 'w') as f:
-                json.dump(results, f, indent=2)
+                }
+                for construct, _ in constructs
+            )
+            write_json_records(output_file, results)
                 
             self.console.print("[bold green]Results exported successfully![/bold green]")
         except Exception as e:
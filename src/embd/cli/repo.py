@@ -1,12 +1,12 @@
 """CLI tool for processing git repositories."""
 
 import os
+import subprocess
+import sys
 from typing import Optional, List
-from rich.table import Table
 import click
-from git import Repo, exc as git_exc
 from .base import ProcessorCLI
-from ..database_manager import DatabaseManager
+from .. import config
 
 class RepoCLI(ProcessorCLI):
     """CLI tool for repository processing."""
@@ -15,6 +15,26 @@ class RepoCLI(ProcessorCLI):
         """Initialize repository processor CLI."""
         super().__init__('local')
 
+    @staticmethod
+    def validate_repo(repo_path: str) -> None:
+        """Check that a path is a non-bare git working tree.
+        
+        Args:
+            repo_path: Path to validate
+            
+        Raises:
+            click.UsageError: If the path is not a usable git repository
+        """
+        result = subprocess.run(
+            ['git', '-C', repo_path, 'rev-parse', '--is-bare-repository'],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise click.UsageError("Not a git repository")
+        if result.stdout.strip() == 'true':
+            raise click.UsageError("Cannot process bare repository")
+
     def process_repo(self, 
                     repo_name: Optional[str] = None, 
                     path: Optional[str] = None, 
@@ -22,7 +42,11 @@ class RepoCLI(ProcessorCLI):
                     output: Optional[str] = None,
                     list_only: bool = False,
                     include: Optional[List[str]] = None,
-                    exclude: Optional[List[str]] = None) -> None:
+                    exclude: Optional[List[str]] = None,
+                    workers: int = config.PARSE_WORKERS,
+                    embed_concurrency: int = config.EMBED_CONCURRENCY,
+                    force: bool = False,
+                    embed: bool = True) -> None:
         """Process a git repository.
         
         Args:
@@ -33,20 +57,21 @@ class RepoCLI(ProcessorCLI):
             list_only: Only list files that would be processed
             include: List of glob patterns for files to include
             exclude: List of glob patterns for files to exclude
+            workers: Number of processes used to parse files
+            embed_concurrency: Maximum number of embedding requests in flight
+            force: Reprocess files even if unchanged since the last save
+            embed: Whether to embed constructs; JSON output does not include
+                embeddings, so it can be produced without any API calls
         """
+        if save and not embed:
+            raise click.UsageError("--save needs embeddings; drop --no-embed")
         try:
             # Determine repository path and name
             repo_path = os.path.abspath(path if path else os.getcwd())
             if not repo_name:
                 repo_name = os.path.basename(repo_path)
 
-            # Validate repository
-            try:
-                repo = Repo(repo_path)
-                if repo.bare:
-                    raise click.UsageError("Cannot process bare repository")
-            except git_exc.InvalidGitRepositoryError:
-                raise click.UsageError("Not a git repository")
+            self.validate_repo(repo_path)
 
             self.console.print(f"[bold cyan]Processing repository:[/bold cyan] {repo_name}")
             self.console.print(f"[bold cyan]Path:[/bold cyan] {repo_path}")
@@ -54,62 +79,87 @@ class RepoCLI(ProcessorCLI):
             # Create processor with patterns
             processor = self.create_processor(
                 repo_path=repo_path,
+                repository=repo_name,
                 include_patterns=include,
-                exclude_patterns=exclude
+                exclude_patterns=exclude,
+                workers=workers,
+                embed_concurrency=embed_concurrency,
+                embed=embed
             )
             
             if list_only:
-                # Create a table to show files
-                table = Table(title="Files to Process")
-                table.add_column("Status", style="cyan", no_wrap=True)
-                table.add_column("Path", style="white")
-                
-                processable = processor.list_processable_files()
-                skipped = [
-                    (f, os.path.relpath(f, repo_path)) 
-                    for f in processor.get_tracked_files() 
-                    if not processor.should_process_file(f)
-                ]
-                
-                # Add processable files
-                for _, rel_path in sorted(processable):
-                    table.add_row("INCLUDE", rel_path)
-                
-                # Add skipped files
-                for _, rel_path in sorted(skipped):
-                    table.add_row("EXCLUDE", rel_path, style="dim")
+                # Split tracked files in one pass over the cached listing
+                processable = []
+                skipped = []
+                for f in processor.get_tracked_files():
+                    target = processable if processor.should_process_file(f) else skipped
+                    target.append(processor.relative_path(f))
+                rows = [("INCLUDE", rel_path) for rel_path in sorted(processable)]
+                rows += [("EXCLUDE", rel_path) for rel_path in sorted(skipped)]
                 
-                self.console.print(table)
+                if not self.console.is_terminal:
+                    # Piped or redirected: skip Rich's per-cell measuring and
+                    # styling and write plain tab-separated rows in one go
+                    sys.stdout.write("".join(f"{status}\t{rel_path}\n" for status, rel_path in rows))
+                else:
+                    from rich.table import Table
+                    table = Table(title="Files to Process", pad_edge=False)
+                    table.add_column("Status", style="cyan", no_wrap=True)
+                    table.add_column("Path", style="white")
+                    for status, rel_path in rows:
+                        table.add_row(status, rel_path, style="dim" if status == "EXCLUDE" else None)
+                    self.console.print(table)
                 self.console.print(f"\nTotal files: {len(processable)} included, {len(skipped)} excluded")
                 return
             
-            # Process the repository
+            # Skip files whose git blob matches the one stored by the last save
+            blobs = {}
+            if save:
+                blobs = processor.get_tracked_blobs()
+                if not force:
+                    unchanged = self.db_manager.unchanged_files(repo_name, blobs)
+                    if unchanged:
+                        processor.skip_files(unchanged)
+                        self.console.print(f"[dim]Skipping {len(unchanged)} files unchanged since the last save[/dim]")
+                    blobs = {path: sha for path, sha in blobs.items() if path not in unchanged}
+            
+            # Process the repository; when saving, each embedded batch is
+            # written by a background thread while later batches are embedded
             self.console.print("\n[bold cyan]Starting processing...[/bold cyan]")
-            constructs, _ = processor.process()
-            print(f"\nCLI DEBUG: Received {len(constructs)} constructs from processor.process()")
+            if save:
+                with self.db_manager.background_store() as store:
+                    constructs, _ = processor.process(on_embedded=store)
+            else:
+                constructs, _ = processor.process()
             self.console.print(f"[bold cyan]Processing complete. Found {len(constructs)} constructs.[/bold cyan]\n")
             
-            # Debug: show constructs
-            for i, (construct, _) in enumerate(constructs):
-                print(f"CLI DEBUG: {i+1}. {construct.name} ({construct.construct_type}) lines {construct.line_start}-{construct.line_end}")
+            # Only files that were actually processed, with every embedding
+            # generated, are recorded as ingested; the rest are retried next run
+            processed = processor.processed_files - processor.failed_files
+            if save and processor.failed_files:
+                self.console.print(
+                    f"[yellow]Embedding failed for constructs in {len(processor.failed_files)} files; "
+                    "they will be processed again on the next save[/yellow]"
+                )
+            blobs = {
+                path: sha for path, sha in blobs.items()
+                if os.path.join(repo_path, path) in processed
+            }
             
-            # Add repository info to constructs
-            for construct, _ in constructs:
-                construct.repository = repo_name
+            if config.DEBUG:
+                for i, (construct, _) in enumerate(constructs):
+                    print(f"CLI DEBUG: {i+1}. {construct.name} ({construct.construct_type}) lines {construct.line_start}-{construct.line_end}")
             
-            print(f"\nCLI DEBUG: After adding repo info, still have {len(constructs)} constructs")
+            # Constructs were stored as they were embedded
+            if save:
+                self.db_manager.record_ingested_files(repo_name, blobs)
+                if constructs:
+                    self.console.print("[bold green]Results saved successfully![/bold green]")
             
             if not constructs:
                 self.console.print("[yellow]No code constructs found.[/yellow]")
                 return
                 
-            # Save to database if requested
-            if save:
-                print(f"CLI DEBUG: About to save {len(constructs)} constructs to database")
-                db = DatabaseManager()
-                db.init_db()
-                self.save_results(constructs, db)
-                
             # Export to file if requested
             if output:
                 self.export_results(constructs, output)
@@ -130,9 +180,17 @@ class RepoCLI(ProcessorCLI):
 @click.option('--list-files', is_flag=True, help='Only list files that would be processed')
 @click.option('--include', multiple=True, help='Glob patterns for files to include (can be specified multiple times)')
 @click.option('--exclude', multiple=True, help='Glob patterns for files to exclude (can be specified multiple times)')
+@click.option('--workers', '-j', type=click.IntRange(min=1), default=config.PARSE_WORKERS,
+              show_default=True, help='Number of processes used to parse files')
+@click.option('--embed-concurrency', type=click.IntRange(min=1), default=config.EMBED_CONCURRENCY,
+              show_default=True, help='Maximum number of embedding requests in flight')
+@click.option('--force', is_flag=True, help='Reprocess files even if unchanged since the last save')
+@click.option('--embed/--no-embed', default=True, help='Embed constructs (--no-embed only parses, for --output)')
 def main(repo_name: Optional[str] = None, path: Optional[str] = None, save: bool = False, 
          output: Optional[str] = None, list_files: bool = False,
-         include: tuple[str, ...] = (), exclude: tuple[str, ...] = ()):
+         include: tuple[str, ...] = (), exclude: tuple[str, ...] = (),
+         workers: int = config.PARSE_WORKERS, embed_concurrency: int = config.EMBED_CONCURRENCY,
+         force: bool = False, embed: bool = True):
     """Process a git repository.
     
     Examples:
@@ -148,6 +206,9 @@ def main(repo_name: Optional[str] = None, path: Optional[str] = None, save: bool
         
         # Preview filtered files
         embd-repo --list-files --include "**/*.py" --exclude "**/tests/**"
+        
+        # Export parsed constructs without calling the embedding API
+        embd-repo --no-embed --output constructs.json
     """
     cli = RepoCLI()
     cli.process_repo(
@@ -157,7 +218,11 @@ def main(repo_name: Optional[str] = None, path: Optional[str] = None, save: bool
         output=output,
         list_only=list_files,
         include=list(include) if include else None,
-        exclude=list(exclude) if exclude else None
+        exclude=list(exclude) if exclude else None,
+        workers=workers,
+        embed_concurrency=embed_concurrency,
+        force=force,
+        embed=embed
     )
 
 if __name__ == '__main__':
@@ -1,11 +1,7 @@
 """CLI tool for resetting the database."""
 
 import click
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from sqlalchemy import inspect, text
-from ..database_manager import DatabaseManager
-from .. import models
+from .._console import console
 
 @click.command()
 @click.option('--force', is_flag=True, help='Force reset without confirmation')
@@ -18,8 +14,6 @@ def main(force: bool, verify: bool):
     2. Recreate tables with current schema
     3. Initialize vector similarity indexes
     """
-    console = Console()
-    
     if not force:
         console.print('[yellow]Warning:[/yellow] This will delete all existing data including:')
         console.print('  • All code embeddings')
@@ -29,6 +23,12 @@ def main(force: bool, verify: bool):
             console.print('[red]Aborted[/red]')
             return
     
+    # Imported here so --help and a declined confirmation return without loading them
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from sqlalchemy import inspect, text
+    from ..database_manager import DatabaseManager
+    from .. import models
+    
     db = DatabaseManager()
     
     try:
@@ -43,17 +43,20 @@ def main(force: bool, verify: bool):
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
-                console=console
+                console=console,
+                refresh_per_second=4
             ) as progress:
                 task = progress.add_task("[cyan]Dropping existing tables...", total=len(table_names))
                 
                 with db.engine.connect() as conn:
+                    # Postgres drops a comma-separated list of tables in one statement
+                    quote = conn.dialect.identifier_preparer.quote
+                    tables_sql = ", ".join(quote(table) for table in reversed(table_names))
                     trans = conn.begin()
                     try:
-                        for table in reversed(table_names):
-                            conn.execute(text(f'DROP TABLE IF EXISTS {table} CASCADE;'))
-                            progress.advance(task)
+                        conn.execute(text(f'DROP TABLE IF EXISTS {tables_sql} CASCADE;'))
                         trans.commit()
+                        progress.update(task, completed=len(table_names))
                     except Exception as e:
                         trans.rollback()
                         raise click.ClickException(f"Error dropping tables: {str(e)}")
@@ -61,6 +64,7 @@ def main(force: bool, verify: bool):
         # Reinitialize database
         console.print('[cyan]Reinitializing database schema...[/cyan]')
         db.init_db()
+        db.create_vector_index()
         
         if verify:
             console.print('\n[cyan]Verifying database state:[/cyan]')
@@ -71,10 +75,15 @@ def main(force: bool, verify: bool):
                 missing_tables = set(models.Base.metadata.tables.keys()) - set(current_tables)
                 console.print(f'[red]Warning: Missing tables: {", ".join(missing_tables)}[/red]')
             else:
-                # Check that tables are empty
+                # Check that tables are empty, counting all of them in one round-trip
                 with db.engine.connect() as conn:
-                    for table in current_tables:
-                        result = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() or 0
+                    quote = conn.dialect.identifier_preparer.quote
+                    counts_sql = " UNION ALL ".join(
+                        f"SELECT :name_{i} AS name, COUNT(*) AS n FROM {quote(table)}"
+                        for i, table in enumerate(current_tables)
+                    )
+                    params = {f"name_{i}": table for i, table in enumerate(current_tables)}
+                    for table, result in conn.execute(text(counts_sql), params):
                         if result > 0:
                             console.print(f'[red]Warning: Table {table} contains {result} rows[/red]')
                         else:
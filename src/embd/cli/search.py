@@ -1,10 +1,10 @@
 """CLI tool for semantic code search."""
 
 import click
-import json
 from typing import Optional
-from rich.console import Console
-from .. import DatabaseManager, EmbeddingGenerator
+from .. import config
+from .base import write_json_records
+from .._console import console
 
 @click.command()
 @click.argument('query')
@@ -12,19 +12,42 @@ from .. import DatabaseManager, EmbeddingGenerator
 @click.option('--min-similarity', '-s', default=0.7, help='Minimum similarity score')
 @click.option('--type', '-t', help='Filter by construct type')
 @click.option('--output', '-o', type=str, help='Output file for JSON results')
-def main(query: str, limit: int = 5, min_similarity: float = 0.7, type: Optional[str] = None, output: Optional[str] = None):
+@click.option('--ef-search', type=int, default=None,
+              help='HNSW candidates examined per query (higher = better recall, slower)')
+def main(query: str, limit: int = 5, min_similarity: float = 0.7, type: Optional[str] = None,
+         output: Optional[str] = None, ef_search: Optional[int] = None):
     """Search for similar code using semantic similarity."""
-    console = Console()
+    # Imported here so --help and argument errors return without loading them
+    from ..database_manager import DatabaseManager, StaleSchemaError
     
     # Initialize database and embedding generator
     db = DatabaseManager()
-    db.init_db()  # Ensure database is initialized
+    # Searching is read-only, so check for the schema instead of creating it
+    exists, version = db.schema_state()
+    if not exists:
+        console.print("[bold red]No code_embeddings table found. Index some code with embd-repo --save first.[/bold red]")
+        raise click.Abort()
+    try:
+        db.check_schema_version(version)
+    except StaleSchemaError as e:
+        console.print(f"[bold red]{e}[/bold red]")
+        raise click.Abort()
+    # Loaded only once there is an index to search
+    from ..embedding import EmbeddingGenerator
     embedding_gen = EmbeddingGenerator()
     
     # Generate embedding for the query
     try:
         query_embedding = embedding_gen.generate(query)
         
+        if config.DEBUG:
+            # Confirm the search is served by the vector index rather than a full scan
+            plan = db.explain_similar_code(query_embedding, limit=limit, min_similarity=min_similarity,
+                                           construct_type=type)
+            console.print(f"[dim]{plan}[/dim]")
+            if "Seq Scan on code_embeddings" in plan:
+                console.print("[yellow]Warning: similarity search is not using a vector index[/yellow]")
+        
         # Search for similar code
         results = db.search_similar_code(
             query_embedding=query_embedding,
@@ -32,29 +55,30 @@ def main(query: str, limit: int = 5, min_similarity: float = 0.7, type: Optional
             min_similarity=min_similarity,
             include_code=True,
             include_description=True,
-            construct_type=type
+            construct_type=type,
+            ef_search=ef_search
         )
         
-        # Format output
-        formatted_results = []
-        for result in results:
-            formatted_results.append({
-                'similarity': result['similarity'],
-                'type': result['type'],
-                'name': result.get('name', ''),
-                'filename': result['filename'],
-                'code': result.get('code', ''),
-                'description': result.get('description', '')
-            })
-        
+        # Similarity scores are computed and ordered by PostgreSQL, so results
+        # only need reshaping for JSON output and can be printed as returned
         if output:
-            with open(output, 'w') as f:
-                json.dump(formatted_results, f, indent=2)
+            formatted_results = (
+                {
+                    'similarity': result['similarity'],
+                    'type': result['type'],
+                    'name': result.get('name', ''),
+                    'filename': result['filename'],
+                    'code': result.get('code', ''),
+                    'description': result.get('description', '')
+                }
+                for result in results
+            )
+            write_json_records(output, formatted_results)
         else:
             # Print results nicely with rich
             console.print("[bold green]Search Results:[/bold green]")
-            for i, result in enumerate(formatted_results, 1):
-                console.print(f"\n[bold cyan]{i}. {result['name']} ({result['type']})[/bold cyan]")
+            for i, result in enumerate(results, 1):
+                console.print(f"\n[bold cyan]{i}. {result.get('name', '')} ({result['type']})[/bold cyan]")
                 console.print(f"[yellow]Similarity:[/yellow] {result['similarity']:.2f}")
                 console.print(f"[yellow]File:[/yellow] {result['filename']}")
                 if result.get('description'):
@@ -1,10 +1,9 @@
 """CLI tool for processing web documents."""
 
 import click
-from typing import Optional
-from rich.console import Console
-from ..database_manager import DatabaseManager
+from typing import List, Optional
 from .base import ProcessorCLI
+from .. import config
 
 class WebCLI(ProcessorCLI):
     """CLI tool for web document processing."""
@@ -13,30 +12,39 @@ class WebCLI(ProcessorCLI):
         """Initialize web processor CLI."""
         super().__init__('web')
 
-    def process_url(self, url: str, save: bool = False, output: Optional[str] = None) -> None:
-        """Process a web URL.
+    def process_urls(self, urls: List[str], save: bool = False, output: Optional[str] = None,
+                     embed_concurrency: int = config.EMBED_CONCURRENCY, embed: bool = True) -> None:
+        """Process web URLs, fetching them concurrently.
         
         Args:
-            url: URL to process
+            urls: URLs to process
             save: Whether to save results to database
             output: Optional output file for JSON results
+            embed_concurrency: Maximum number of embedding requests in flight
+            embed: Whether to embed constructs; JSON output does not include
+                embeddings, so it can be produced without any API calls
         """
+        if save and not embed:
+            raise click.UsageError("--save needs embeddings; drop --no-embed")
         try:
-            self.console.print(f"[bold cyan]Processing URL:[/bold cyan] {url}")
+            for url in urls:
+                self.console.print(f"[bold cyan]Processing URL:[/bold cyan] {url}")
             
-            # Create and run processor
-            processor = self.create_processor(url=url)
-            constructs, _ = processor.process()
+            # Create and run processor; when saving, embedded batches are
+            # written by a background thread while later batches are embedded
+            processor = self.create_processor(url=urls, embed_concurrency=embed_concurrency, embed=embed)
+            if save:
+                with self.db_manager.background_store() as store:
+                    constructs, _ = processor.process(on_embedded=store)
+            else:
+                constructs, _ = processor.process()
             
             if not constructs:
                 self.console.print("[yellow]No code constructs found.[/yellow]")
                 return
                 
-            # Save to database if requested
             if save:
-                db = DatabaseManager()
-                db.init_db()
-                self.save_results(constructs, db)
+                self.console.print("[bold green]Results saved successfully![/bold green]")
                 
             # Export to file if requested
             if output:
@@ -49,13 +57,23 @@ class WebCLI(ProcessorCLI):
             raise click.Abort()
 
 @click.command()
-@click.argument('url')
+@click.argument('urls', nargs=-1)
+@click.option('--url-file', type=click.File('r'), help='File with one URL per line')
 @click.option('--save/--no-save', default=False, help='Save results to database')
 @click.option('--output', '-o', type=str, help='Output file for JSON results')
-def main(url: str, save: bool, output: Optional[str] = None):
-    """Process a web document from URL."""
+@click.option('--embed-concurrency', type=click.IntRange(min=1), default=config.EMBED_CONCURRENCY,
+              show_default=True, help='Maximum number of embedding requests in flight')
+@click.option('--embed/--no-embed', default=True, help='Embed constructs (--no-embed only parses, for --output)')
+def main(urls: tuple, url_file=None, save: bool = False, output: Optional[str] = None,
+         embed_concurrency: int = config.EMBED_CONCURRENCY, embed: bool = True):
+    """Process web documents from one or more URLs."""
+    urls = list(urls)
+    if url_file:
+        urls += [line.strip() for line in url_file if line.strip()]
+    if not urls:
+        raise click.UsageError("Give at least one URL or --url-file")
     cli = WebCLI()
-    cli.process_url(url, save, output)
+    cli.process_urls(urls, save, output, embed_concurrency, embed)
 
 if __name__ == '__main__':
     main()
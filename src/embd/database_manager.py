@@ -1,30 +1,116 @@
 """Database management and operations for the embedding system."""
-from typing import List, Tuple, Dict, Any, Optional
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
-from sqlalchemy import create_engine, select
+import csv
+import functools
+import io
+import itertools
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Tuple, Dict, Any, Optional, Set
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
 
 from . import models
 from . import config
-from .models import CodeConstruct, CodeEmbedding
+from ._console import console
+from .models import CodeConstruct, CodeEmbedding, FileIngestCache, unit_vector
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=None)
+def _engine_for(uri: str) -> Engine:
+    """Create the pooled engine for a database URI once per process."""
+    return create_engine(
+        uri,
+        pool_size=config.POSTGRES_POOL_SIZE,
+        max_overflow=config.POSTGRES_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=config.POSTGRES_POOL_RECYCLE,
+        query_cache_size=config.POSTGRES_QUERY_CACHE_SIZE
+    )
+
+@functools.lru_cache(maxsize=None)
+def _session_factory_for(uri: str) -> sessionmaker:
+    """Create the session factory bound to a URI's shared engine."""
+    return sessionmaker(bind=_engine_for(uri))
+
+def _vector_literal(embedding) -> str:
+    """Format an embedding (float32 array or list) as a halfvec text literal.
+    
+    The column stores half precision, so values are rounded to float16 here;
+    str() of a numpy float16 is the shortest text that parses back to the
+    same half, about a third shorter than float32 and quicker to format.
+    """
+    return "[" + ",".join(map(str, np.asarray(embedding, dtype=np.float16))) + "]"
+
+class StaleSchemaError(RuntimeError):
+    """code_embeddings was created by a schema version this code cannot use."""
 
 class DatabaseManager:
     """Manages all database operations including setup, storage, and retrieval."""
 
+    # Process-wide console shared with the CLI tools
+    console = console
+
     def __init__(self):
-        """Initialize the database manager with SQLAlchemy engine and session."""
-        self.engine = create_engine(config.POSTGRES_URI)
-        self.Session = sessionmaker(bind=self.engine)
-        self.console = Console()
+        """Initialize the database manager with the shared engine and session factory.
+        
+        Managers created in the same process reuse one connection pool.
+        """
+        self.engine = _engine_for(config.POSTGRES_URI)
+        self.Session = _session_factory_for(config.POSTGRES_URI)
+
+    def schema_state(self) -> Tuple[bool, Optional[str]]:
+        """Check whether the code_embeddings table exists, in one round-trip.
+        
+        Returns:
+            Tuple of (table exists, schema version recorded on the table)
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT to_regclass('code_embeddings') IS NOT NULL, "
+                "obj_description(to_regclass('code_embeddings'), 'pg_class')"
+            )).one()
+        return row[0], row[1]
+
+    @staticmethod
+    def check_schema_version(version: Optional[str]) -> None:
+        """Raise StaleSchemaError unless an existing table's version is usable.
+        
+        Args:
+            version: Schema version recorded on the code_embeddings table
+        
+        Raises:
+            StaleSchemaError: If the version is neither current nor compatible
+        """
+        if version != CodeEmbedding.SCHEMA_VERSION and version not in CodeEmbedding.COMPATIBLE_SCHEMA_VERSIONS:
+            raise StaleSchemaError(
+                f"code_embeddings was created by schema version {version or 'unknown'}, "
+                f"not {CodeEmbedding.SCHEMA_VERSION}; run embd-reset-db to recreate it"
+            )
 
     def init_db(self):
-        """Initialize database schema and required indexes."""
-        # Import and create all models
-        from . import models
-        models.Base.metadata.create_all(self.engine)
+        """Initialize database schema and required indexes.
+        
+        Returns immediately when the schema already exists at the current
+        version, so repeated CLI runs skip the DDL round-trips.
         
-        # Create vector similarity indexes
+        Raises:
+            StaleSchemaError: If the table was created by an incompatible
+                schema version, whose stored vectors and index cannot be
+                mixed with new ones
+        """
+        exists, version = self.schema_state()
+        if exists:
+            self.check_schema_version(version)
+            if version == CodeEmbedding.SCHEMA_VERSION:
+                return
+        
+        # Create extension, tables and indexes
         self.init_indexes()
 
     def init_indexes(self):
@@ -32,37 +118,377 @@ class DatabaseManager:
         models.CodeEmbedding.create_indexes(self.engine)
         self.console.print("[green]PostgreSQL tables and indexes created successfully[/green]")
 
-    def store_constructs(self, constructs_data: List[Tuple[CodeConstruct, List[float]]],
+    def create_vector_index(self) -> None:
+        """Create the HNSW similarity index and refresh planner statistics.
+        
+        The build runs with a larger maintenance_work_mem and parallel
+        maintenance workers so the graph fits in memory instead of spilling
+        to disk. Settings the server rejects are skipped. The table is then
+        vacuumed as well as analyzed, which marks the freshly loaded pages
+        all-visible so the covering repository/filename index can answer
+        lookups without visiting the heap.
+        """
+        with self.engine.connect() as conn:
+            self._apply_index_build_settings(conn)
+            models.CodeEmbedding.create_vector_index(conn)
+            conn.execute(text("RESET maintenance_work_mem"))
+            conn.execute(text("RESET max_parallel_maintenance_workers"))
+            conn.commit()
+        # VACUUM cannot run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM (ANALYZE) code_embeddings"))
+        self.console.print("[green]HNSW vector index ready[/green]")
+
+    def _apply_index_build_settings(self, conn) -> None:
+        """Raise session memory and parallelism limits for an index build."""
+        settings = {
+            "maintenance_work_mem": config.INDEX_BUILD_MAINTENANCE_WORK_MEM,
+            "max_parallel_maintenance_workers": config.INDEX_BUILD_PARALLEL_WORKERS,
+        }
+        for name, value in settings.items():
+            self._apply_setting(conn, name, value)
+
+    def _apply_setting(self, conn, name: str, value, is_local: bool = False) -> None:
+        """Set a server setting, keeping the server default if the value is rejected.
+        
+        The value is sent as a bind parameter to set_config, and a savepoint
+        keeps a rejected value from aborting the transaction.
+        
+        Args:
+            conn: Connection or session to apply the setting on
+            name: Setting name
+            value: Setting value, sent as text
+            is_local: Limit the setting to the current transaction, like SET LOCAL
+        """
+        try:
+            with conn.begin_nested():
+                conn.execute(text("SELECT set_config(:name, :value, :is_local)"),
+                             {"name": name, "value": str(value), "is_local": is_local})
+        except SQLAlchemyError as e:
+            self.console.print(f"[yellow]Could not set {name} to {value}, using server default: {e}[/yellow]")
+
+    def store_constructs(self, constructs_data: List[Tuple[CodeConstruct, np.ndarray]],
                         show_progress: bool = True) -> None:
         """Store code constructs and their embeddings with optional progress tracking.
         
+        Library entry point for storing an already embedded list in one
+        call. The CLIs store batches while they are still being embedded
+        through background_store instead.
+        
         Args:
             constructs_data: List of (CodeConstruct, embedding) tuples to store
-            show_progress: Whether to show a progress bar
+            show_progress: Whether to show a progress bar; ignored when the
+                console is not a terminal, where it would only add rendering work
         """
-        if show_progress:
+        if show_progress and self.console.is_terminal:
             self._store_constructs_with_progress(constructs_data)
         else:
-            self._store_constructs_simple(constructs_data)
+            self.bulk_store(constructs_data)
+
+    # Columns written by bulk_store, in COPY order; id must stay first
+    _BULK_COLUMNS = (
+        "id", "filename", "repository", "git_commit", "code", "construct_type",
+        "name", "description", "embedding", "line_start", "line_end"
+    )
 
-    def _store_constructs_simple(self, constructs_data: List[Tuple[CodeConstruct, List[float]]]) -> None:
-        """Store constructs without progress tracking."""
+    def bulk_store(self, constructs_data: Iterable[Tuple[CodeConstruct, np.ndarray]],
+                   on_progress: Optional[Callable[[int], None]] = None,
+                   chunk_size: int = 500) -> None:
+        """Upsert code constructs and their embeddings using COPY.
+        
+        Rows are streamed with COPY FROM STDIN into a temporary staging table
+        and merged into code_embeddings with a single INSERT ... SELECT ...
+        ON CONFLICT, instead of one round-trip per construct. Drivers without
+        psycopg2's copy_expert fall back to multi-row INSERT ... ON CONFLICT
+        statements. When the table is empty the HNSW index is dropped for the
+        load and rebuilt afterwards, which is much faster than maintaining it
+        row by row, and rows are copied straight into code_embeddings
+        without the staging table and merge. The load commits with
+        ``config.BULK_SYNCHRONOUS_COMMIT``.
+        
+        ``constructs_data`` is consumed lazily, one chunk at a time, so it
+        may be a generator that is still being produced (see
+        ``background_store``). When an id appears more than once the last
+        construct wins, as with sequential upserts.
+        
+        Each chunk is written under its own savepoint. If a chunk is rejected
+        because of bad data (for example a NUL byte in the code or an
+        embedding of the wrong size), only that chunk is retried row by row
+        and the offending rows are skipped with a warning.
+        
+        Args:
+            constructs_data: (CodeConstruct, embedding) tuples to store
+            on_progress: Optional callback receiving the number of rows in each
+                chunk once it has been written
+            chunk_size: Rows sent per COPY
+        """
+        chunks = self._row_chunks(constructs_data, chunk_size)
+        first = next(chunks, None)
+        if first is None:
+            return
+        chunks = itertools.chain([first], chunks)
+
+        rebuild_index = False
         with self.Session() as session:
             try:
-                for construct, embedding in constructs_data:
-                    CodeEmbedding.store_embedding(
-                        session=session,
-                        construct=construct,
-                        embedding=embedding
-                    )
+                self._apply_setting(session, "synchronous_commit", config.BULK_SYNCHRONOUS_COMMIT,
+                                    is_local=True)
+                empty = self._table_is_empty(session)
+                if empty:
+                    # Keep other writers out until the first load commits, then
+                    # make sure none got in before the lock was taken
+                    session.execute(text("LOCK TABLE code_embeddings IN SHARE ROW EXCLUSIVE MODE"))
+                    empty = self._table_is_empty(session)
+                rebuild_index = empty and session.execute(text(
+                    f"SELECT to_regclass('{CodeEmbedding.VECTOR_INDEX}') IS NOT NULL"
+                )).scalar()
+                if rebuild_index:
+                    session.execute(text(f"DROP INDEX {CodeEmbedding.VECTOR_INDEX}"))
+
+                cursor = session.connection().connection.cursor()
+                if hasattr(cursor, "copy_expert"):
+                    self._copy_rows(session, cursor, chunks, on_progress, direct=empty)
+                else:
+                    self._upsert_rows(session, chunks, on_progress)
                 session.commit()
             except Exception as e:
                 session.rollback()
                 self.console.print(f"[bold red]Error storing constructs: {str(e)}")
                 raise
 
-    def _store_constructs_with_progress(self, constructs_data: List[Tuple[CodeConstruct, List[float]]]) -> None:
-        """Store constructs with progress bar."""
+        if rebuild_index:
+            self.create_vector_index()
+
+    @staticmethod
+    def _table_is_empty(session) -> bool:
+        """Check whether code_embeddings has no rows."""
+        return session.execute(text("SELECT NOT EXISTS (SELECT 1 FROM code_embeddings)")).scalar()
+
+    @staticmethod
+    def _row_chunks(constructs_data: Iterable[Tuple[CodeConstruct, np.ndarray]],
+                    chunk_size: int) -> Iterator[List[tuple]]:
+        """Convert (construct, embedding) tuples to bulk rows, chunk_size at a time.
+        
+        A single INSERT ... ON CONFLICT cannot touch the same id twice, so
+        each chunk keeps only the last construct for every id.
+        """
+        rows = {}
+        for construct, embedding in constructs_data:
+            construct_id = construct.construct_id
+            rows[construct_id] = (
+                construct_id,
+                construct.filename,
+                construct.repository,
+                construct.git_commit,
+                construct.code,
+                construct.construct_type,
+                construct.name,
+                construct.description,
+                unit_vector(embedding),
+                construct.line_start,
+                construct.line_end
+            )
+            if len(rows) >= chunk_size:
+                yield list(rows.values())
+                rows = {}
+        if rows:
+            yield list(rows.values())
+
+    def _copy_rows(self, session, cursor, chunks: Iterable[List[tuple]],
+                   on_progress: Optional[Callable[[int], None]], direct: bool = False) -> None:
+        """COPY rows into a staging table and merge them into code_embeddings.
+        
+        With ``direct``, for a load into an empty, locked table, rows are
+        copied straight into code_embeddings instead. An id already copied
+        earlier in the load cannot be copied again, so its later rows are
+        held back and upserted once the COPY is done, keeping the last one.
+        """
+        if direct:
+            self._copy_rows_direct(session, cursor, chunks, on_progress)
+            return
+        columns = ", ".join(self._BULK_COLUMNS)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in self._BULK_COLUMNS[1:])
+        copy = self._copier(cursor, "code_embeddings_staging")
+
+        # seq records arrival order so the merge can keep the last copy of an id
+        session.execute(text(
+            "CREATE TEMP TABLE code_embeddings_staging "
+            "(LIKE code_embeddings INCLUDING DEFAULTS, seq bigserial) ON COMMIT DROP"
+        ))
+        for chunk in chunks:
+            self._write_chunk(session, copy, chunk)
+            if on_progress:
+                on_progress(len(chunk))
+        session.execute(text(f"""
+            INSERT INTO code_embeddings ({columns})
+            SELECT DISTINCT ON (id) {columns} FROM code_embeddings_staging
+            ORDER BY id, seq DESC
+            ON CONFLICT (id) DO UPDATE SET {updates}, updated_at = now()
+        """))
+
+    def _copy_rows_direct(self, session, cursor, chunks: Iterable[List[tuple]],
+                          on_progress: Optional[Callable[[int], None]]) -> None:
+        """COPY rows straight into an empty code_embeddings (see _copy_rows)."""
+        copy = self._copier(cursor, "code_embeddings")
+        copied = set()
+        repeated = {}
+        for chunk in chunks:
+            fresh = []
+            for row in chunk:
+                if row[0] in copied:
+                    repeated[row[0]] = row
+                else:
+                    fresh.append(row)
+            copied.update(row[0] for row in fresh)
+            if fresh:
+                self._write_chunk(session, copy, fresh)
+            if on_progress:
+                on_progress(len(chunk))
+        if repeated:
+            self._upsert_rows(session, [list(repeated.values())], None)
+
+    def _copier(self, cursor, table: str) -> Callable[[List[tuple]], None]:
+        """Build a function that COPYs a chunk of bulk rows into table as CSV."""
+        columns = ", ".join(self._BULK_COLUMNS)
+        embedding_index = self._BULK_COLUMNS.index("embedding")
+
+        def copy(chunk: List[tuple]) -> None:
+            # Quote every field so empty strings are not read back as NULL
+            buffer = io.StringIO()
+            csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(
+                row[:embedding_index] + (_vector_literal(row[embedding_index]),) + row[embedding_index + 1:]
+                for row in chunk
+            )
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        return copy
+
+    def _upsert_rows(self, session, chunks: Iterable[List[tuple]],
+                     on_progress: Optional[Callable[[int], None]]) -> None:
+        """Upsert rows with multi-row INSERT ... ON CONFLICT statements."""
+        def upsert(chunk: List[tuple]) -> None:
+            session.execute(CodeEmbedding.upsert_statement(
+                [dict(zip(self._BULK_COLUMNS, row)) for row in chunk]
+            ))
+
+        for chunk in chunks:
+            self._write_chunk(session, upsert, chunk)
+            if on_progress:
+                on_progress(len(chunk))
+
+    @staticmethod
+    def _write_chunk(session, write: Callable[[List[tuple]], None], chunk: List[tuple]) -> int:
+        """Write a chunk of rows under a savepoint, falling back to one row at a time.
+        
+        Only data and integrity errors trigger the fallback; anything else
+        (such as a lost connection) propagates to the caller.
+        
+        Args:
+            session: Session whose transaction the rows are written in
+            write: Callable that writes a list of rows
+            chunk: Rows to write; the first field of each row is its id
+            
+        Returns:
+            Number of rows written
+        """
+        # copy_expert raises the driver's exceptions rather than SQLAlchemy's
+        dbapi = session.get_bind().dialect.dbapi
+        bad_data = (DataError, IntegrityError) + tuple(
+            getattr(dbapi, name) for name in ("DataError", "IntegrityError") if hasattr(dbapi, name)
+        )
+
+        try:
+            with session.begin_nested():
+                write(chunk)
+            return len(chunk)
+        except bad_data as e:
+            if len(chunk) == 1:
+                logger.warning("Skipping construct %s: %s", chunk[0][0], e)
+                return 0
+            logger.warning("Chunk of %d constructs rejected, retrying row by row: %s", len(chunk), e)
+
+        written = 0
+        for row in chunk:
+            try:
+                with session.begin_nested():
+                    write([row])
+                written += 1
+            except bad_data as e:
+                logger.warning("Skipping construct %s: %s", row[0], e)
+        return written
+
+    @contextmanager
+    def background_store(self, max_pending: int = 4) -> Iterator[Callable[[List[Tuple[CodeConstruct, np.ndarray]]], None]]:
+        """Run bulk_store on a writer thread while the caller produces constructs.
+        
+        Yields a callable that hands a batch of (CodeConstruct, embedding)
+        tuples to the writer. The writer streams batches into one bulk_store
+        transaction as they arrive, so database writes overlap with whatever
+        produces the batches (typically embedding requests). At most
+        ``max_pending`` batches wait in the queue; beyond that the callable
+        blocks until the writer catches up.
+        
+        Leaving the block normally waits for the writer to commit and
+        re-raises any error it hit. If the block raises, the writer's
+        transaction is rolled back and nothing is stored.
+        
+        Args:
+            max_pending: Maximum number of batches queued for the writer
+        """
+        batches: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        done, abort = object(), object()
+        errors = []
+
+        def constructs() -> Iterator[Tuple[CodeConstruct, np.ndarray]]:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    return
+                if batch is abort:
+                    raise RuntimeError("Store aborted by the producer")
+                yield from batch
+
+        def write() -> None:
+            try:
+                self.bulk_store(constructs())
+            except BaseException as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=write, name="embd-db-writer", daemon=True)
+
+        def put(item) -> None:
+            # Poll so a writer that died cannot leave the producer blocked forever
+            while writer.is_alive():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            if errors:
+                raise errors[0]
+
+        writer.start()
+        try:
+            yield put
+            put(done)
+        except BaseException:
+            # Roll the writer back; an error of its own is secondary here
+            if writer.is_alive():
+                try:
+                    put(abort)
+                except Exception:
+                    pass
+            writer.join()
+            raise
+        writer.join()
+        if errors:
+            raise errors[0]
+
+    def _store_constructs_with_progress(self, constructs_data: List[Tuple[CodeConstruct, np.ndarray]]) -> None:
+        """Store constructs with a progress bar advanced per COPY chunk."""
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
+        
         total_constructs = len(constructs_data)
 
         with Progress(
@@ -71,24 +497,16 @@ class DatabaseManager:
             BarColumn(),
             TextColumn("[cyan]{task.completed}/{task.total}"),
             TimeElapsedColumn(),
-            console=self.console
+            console=self.console,
+            refresh_per_second=4  # Cap repaints; updates arrive once per COPY chunk
         ) as progress:
             save_task = progress.add_task("[bold green]Saving to Database...", total=total_constructs)
-
-            with self.Session() as session:
-                try:
-                    for construct, embedding in constructs_data:
-                        CodeEmbedding.store_embedding(
-                            session=session,
-                            construct=construct,
-                            embedding=embedding
-                        )
-                        progress.update(save_task, advance=1)
-                    session.commit()
-                except Exception as e:
-                    session.rollback()
-                    self.console.print(f"[bold red]Error storing constructs: {str(e)}")
-                    raise
+            self.bulk_store(
+                constructs_data,
+                on_progress=lambda n: progress.update(save_task, advance=n)
+            )
+            # Duplicate ids are merged before the copy, so finish the bar explicitly
+            progress.update(save_task, completed=total_constructs)
 
     def get_constructs_by_type(
         self,
@@ -97,9 +515,12 @@ class DatabaseManager:
         include_code: bool = True,
         include_description: bool = True,
         include_embedding: bool = False
-    ) -> List[dict]:
+    ) -> Iterator[dict]:
         """Retrieve code constructs of a specific type.
         
+        Rows are streamed from a server-side cursor and yielded one at a
+        time, so large result sets are never held in memory at once.
+        
         Args:
             construct_type: Type of code construct to retrieve
             limit: Maximum number of results to return
@@ -107,42 +528,38 @@ class DatabaseManager:
             include_description: Whether to include descriptions
             include_embedding: Whether to include embeddings
             
-        Returns:
-            List of dictionaries containing matched code constructs
+        Yields:
+            Dictionaries containing matched code constructs; embeddings are
+            float32 numpy arrays
         """
         with self.Session() as session:
             try:
-                # Build query fields based on requested data
-                query_fields = [
-                    CodeEmbedding.id,
-                    CodeEmbedding.filename,
-                    CodeEmbedding.repository,
-                    CodeEmbedding.construct_type,
-                    CodeEmbedding.name,
-                    CodeEmbedding.line_start,
-                    CodeEmbedding.line_end,
-                    CodeEmbedding.git_commit
-                ]
-
-                if include_code:
-                    query_fields.append(CodeEmbedding.code)
-                if include_description:
-                    query_fields.append(CodeEmbedding.description)
-                if include_embedding:
-                    query_fields.append(CodeEmbedding.embedding)
-
-                # Build and execute query
-                stmt = select(*query_fields).where(
-                    CodeEmbedding.construct_type == construct_type
-                ).limit(limit)
-
-                results = session.execute(stmt).mappings().all()
-                return [dict(r) for r in results]
+                stmt = CodeEmbedding._constructs_by_type_statement(
+                    include_code, include_description, include_embedding
+                )
+
+                results = session.execute(
+                    stmt.execution_options(stream_results=True, yield_per=100),
+                    {"construct_type": construct_type, "limit": limit}
+                ).mappings()
+                for row in results:
+                    construct = dict(row)
+                    if include_embedding and construct['embedding'] is not None:
+                        construct['embedding'] = np.asarray(construct['embedding'], dtype=np.float32)
+                    yield construct
 
             except Exception as e:
                 self.console.print(f"[bold red]Error retrieving constructs: {str(e)}")
                 raise
 
+    def _apply_ef_search(self, session, ef_search: Optional[int]) -> None:
+        """Set hnsw.ef_search for the session's current transaction only.
+        
+        Defaults to config.HNSW_EF_SEARCH; a value pgvector rejects leaves
+        the server default in place instead of aborting the search.
+        """
+        self._apply_setting(session, "hnsw.ef_search", ef_search or config.HNSW_EF_SEARCH, is_local=True)
+
     def search_similar_code(
         self,
         query_embedding: List[float],
@@ -152,7 +569,8 @@ class DatabaseManager:
         include_description: bool = True,
         include_embedding: bool = False,
         for_reconstruction: bool = False,
-        construct_type: Optional[str] = None
+        construct_type: Optional[str] = None,
+        ef_search: Optional[int] = None
     ) -> List[dict]:
         """Search for similar code using vector similarity.
         
@@ -165,12 +583,15 @@ class DatabaseManager:
             include_embedding: Whether to include embeddings in results 
             for_reconstruction: Whether to include all fields needed for reconstruction
             construct_type: Optional filter by construct type
+            ef_search: HNSW candidate list size for this search; larger values
+                       trade speed for recall (defaults to config.HNSW_EF_SEARCH)
             
         Returns:
             List of similar code constructs with similarity scores
         """
         with self.Session() as session:
-            query = models.CodeEmbedding.similar_code(
+            self._apply_ef_search(session, ef_search)
+            return models.CodeEmbedding.similar_code(
                 session=session,
                 query_embedding=query_embedding,
                 limit=limit,
@@ -178,27 +599,116 @@ class DatabaseManager:
                 include_code=include_code,
                 include_description=include_description,
                 include_embedding=include_embedding,
-                for_reconstruction=for_reconstruction
+                for_reconstruction=for_reconstruction,
+                construct_type=construct_type
             )
-            # If construct_type is provided, filter results
-            if construct_type:
-                query = [r for r in query if r['type'] == construct_type]
-            return query[:limit]
+
+    def search_similar_code_batch(self, query_embeddings: List[List[float]],
+                                  ef_search: Optional[int] = None, **kwargs) -> List[List[dict]]:
+        """Search for code similar to each of several embeddings in one round-trip.
+        
+        Args:
+            query_embeddings: The query embedding vectors
+            ef_search: HNSW candidate list size for each search (defaults to
+                       config.HNSW_EF_SEARCH)
+            **kwargs: Same search options accepted by search_similar_code
+            
+        Returns:
+            One list of similar code constructs per query embedding, in order
+        """
+        with self.Session() as session:
+            self._apply_ef_search(session, ef_search)
+            return models.CodeEmbedding.similar_code_batch(session, query_embeddings, **kwargs)
+
+    def search_similar_code_np(self, query_embedding: List[float], ef_search: Optional[int] = None,
+                               **kwargs) -> Tuple[List[dict], np.ndarray]:
+        """Search for similar code, returning the embeddings as one float32 matrix.
+        
+        Args:
+            query_embedding: The query embedding vector
+            ef_search: HNSW candidate list size for this search (defaults to
+                       config.HNSW_EF_SEARCH)
+            **kwargs: Same search options accepted by CodeEmbedding.similar_code_np
+            
+        Returns:
+            Tuple of the results, without embeddings, and an array whose
+            rows are their embeddings
+        """
+        with self.Session() as session:
+            self._apply_ef_search(session, ef_search)
+            return models.CodeEmbedding.similar_code_np(session, query_embedding, **kwargs)
+
+    def explain_similar_code(self, query_embedding: List[float], **kwargs) -> str:
+        """Return the PostgreSQL query plan for a similarity search.
+        
+        Args:
+            query_embedding: The query embedding vector
+            **kwargs: Same search options accepted by CodeEmbedding.similar_code_query
+            
+        Returns:
+            The EXPLAIN output as a single string
+        """
+        stmt = models.CodeEmbedding.similar_code_query(query_embedding, **kwargs)
+        compiled = stmt.compile(dialect=self.engine.dialect, compile_kwargs={"literal_binds": True})
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN {compiled}").all()
+        return "\n".join(row[0] for row in rows)
+
+    def unchanged_files(self, repository: str, blobs: Dict[str, str]) -> Set[str]:
+        """Find files whose git blob matches the one recorded at their last ingest.
+        
+        Args:
+            repository: Repository name
+            blobs: Mapping of relative path to current git blob SHA
+            
+        Returns:
+            Relative paths that can be skipped
+        """
+        with self.Session() as session:
+            ingested = FileIngestCache.ingested_blobs(session, repository)
+        return {path for path, sha in blobs.items() if ingested.get(path) == sha}
+
+    def record_ingested_files(self, repository: str, blobs: Dict[str, str]) -> None:
+        """Record the git blob of each file whose constructs were just stored.
+        
+        Args:
+            repository: Repository name
+            blobs: Mapping of relative path to git blob SHA
+        """
+        if not blobs:
+            return
+        with self.Session() as session:
+            try:
+                FileIngestCache.record(session, repository, blobs)
+                session.commit()
+            except SQLAlchemyError:
+                session.rollback()
+                raise
 
     def clear_constructs(self, repository: Optional[str] = None) -> None:
         """Clear all constructs from the database, optionally filtering by repository.
         
+        The file ingest cache is cleared with them so the next run
+        reprocesses every file. Clearing everything truncates both tables
+        instead of deleting row by row.
+        
         Args:
             repository: Optional repository name to clear constructs for
         """
         with self.Session() as session:
             try:
                 if repository:
+                    # Plain server-side DELETEs; nothing in this session needs expiring
                     session.query(CodeEmbedding).filter(
                         CodeEmbedding.repository == repository
-                    ).delete()
+                    ).delete(synchronize_session=False)
+                    session.query(FileIngestCache).filter(
+                        FileIngestCache.repository == repository
+                    ).delete(synchronize_session=False)
                 else:
-                    session.query(CodeEmbedding).delete()
+                    session.execute(text(
+                        f"TRUNCATE {CodeEmbedding.__tablename__}, {FileIngestCache.__tablename__}"
+                    ))
                 session.commit()
             except Exception as e:
                 session.rollback()
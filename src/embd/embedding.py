@@ -1,19 +1,28 @@
 """Embedding generation using Google's Gemini API."""
 
+import asyncio
+import hashlib
+import itertools
 import logging
+import os
+import sqlite3
+import threading
 import time
-from typing import List, Optional, Literal, Union
-from rich.live import Live
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Callable, Dict, List, Optional, Literal, Union
 from rich.panel import Panel
-from rich.align import Align
-from rich.console import Console
-from rich.text import Text
-from google import genai
-from google.genai import types
 from . import config
+from ._console import console
 
 logger = logging.getLogger(__name__)
 
+def _embed_config(task_type: Optional[str] = None):
+    """Build the embed_content request config (imports the SDK's types lazily)."""
+    from google.genai import types
+    return types.EmbedContentConfig(task_type=task_type)
+
 # Supported task types for embedding generation
 TaskType = Literal[
     "SEMANTIC_SIMILARITY",
@@ -26,6 +35,57 @@ TaskType = Literal[
     "CODE_RETRIEVAL_QUERY"
 ]
 
+class _EmbeddingStore:
+    """SQLite table of float32 embeddings keyed by the generator's cache key.
+    
+    Backs the in-memory LRU so re-indexing unchanged text in a later run
+    does not call the API again. Safe to share between threads.
+    """
+    
+    def __init__(self, path: str):
+        """Open (creating if needed) the store at path."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL with normal sync keeps each small commit cheap
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Return the stored embedding for key, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        # frombuffer over bytes is already read-only
+        return np.frombuffer(row[0], dtype=np.float32)
+    
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the stored embeddings among keys, looked up in a few queries."""
+        rows = []
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters per statement
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows += self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+        return {key: np.frombuffer(vector, dtype=np.float32) for key, vector in rows}
+    
+    def put(self, key: bytes, embedding: np.ndarray) -> None:
+        """Store an embedding, replacing any previous value for key."""
+        self.put_many({key: embedding})
+    
+    def put_many(self, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """Store several embeddings in one transaction."""
+        rows = [(key, np.asarray(embedding, dtype=np.float32).tobytes()) for key, embedding in embeddings.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
 class EmbeddingGenerator:
     """Centralized embedding generation using Gemini API."""
     
@@ -36,16 +96,44 @@ class EmbeddingGenerator:
             task_type: Optional task type for optimizing embeddings.
                       If not provided, uses raw embeddings.
         """
-        self.client = genai.Client(api_key=config.GEMINI_API_KEY)
+        # The Gemini SDK takes several hundred ms to import, so it is loaded
+        # when a generator is created rather than when this module is
+        from google import genai
+        
+        # One client per API key; requests rotate between them
+        keys = config.GEMINI_API_KEYS or [config.GEMINI_API_KEY]
+        self.clients = [genai.Client(api_key=key) for key in keys]
+        self.client = self.clients[0]
+        self._client_order = itertools.cycle(range(len(self.clients)))
+        self._client_lock = threading.Lock()
+        # time.monotonic() before which each key should not be used again
+        self._cooldown_until = [0.0] * len(self.clients)
         self.task_type = task_type
-        self.default_embedding = [0.0] * config.EMBEDDING_DIMENSION
-        self.console = Console()
+        # BLAKE2b state after the model and task type prefix, copied for each
+        # cache key so only the text itself is hashed per lookup
+        self._key_hasher = hashlib.blake2b(
+            f"{config.EMBEDDING_MODEL}\0{task_type or ''}\0".encode(),
+            digest_size=16
+        )
+        # Returned by reference on failures, so keep it read-only
+        self.default_embedding = np.zeros(config.EMBEDDING_DIMENSION, dtype=np.float32)
+        self.default_embedding.setflags(write=False)
+        self.console = console
         self.status_panel = Panel("Initializing...", title="Embedding Status")
         self.total_tokens = 0
         self.successful_embeddings = 0
         self.failed_embeddings = 0
         self.start_time = time.time()
         self.current_file = "No file"
+        # LRU cache of embeddings keyed by a hash of the model, task type and text
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._cache_size = config.EMBEDDING_CACHE_SIZE
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        # Repeated texts in a batch that were embedded once and shared
+        self.duplicates_skipped = 0
+        # Optional on-disk tier behind the LRU, shared across runs
+        self._store = _EmbeddingStore(config.EMBEDDING_CACHE_PATH) if config.EMBEDDING_CACHE_PATH else None
         
     def _update_status_panel(self, current_action: str, is_error: bool = False) -> None:
         """Update the status panel with current stats."""
@@ -72,9 +160,10 @@ class EmbeddingGenerator:
             - Truncated text
             - Estimated token count
         """
-        # Rough estimate: 1 token ≈ 4 characters
-        # Use a conservative estimate to account for special tokens
-        char_limit = config.EMBEDDING_TOKEN_LIMIT * 3
+        # Estimate tokens from length, with the same ratio used for the limit,
+        # instead of splitting the text into words just to count them
+        chars_per_token = config.EMBEDDING_CHARS_PER_TOKEN
+        char_limit = config.EMBEDDING_TOKEN_LIMIT * chars_per_token
         
         if len(text) > char_limit:
             truncated = text[:char_limit]
@@ -84,14 +173,108 @@ class EmbeddingGenerator:
             break_point = max(last_newline, last_space)
             if break_point > 0:
                 truncated = truncated[:break_point]
-            
-            # Estimate tokens (rough approximation)
-            token_estimate = len(truncated.split())
-            return truncated, token_estimate
+            text = truncated
+        
+        return text, -(-len(text) // chars_per_token)
+
+    def _cache_key(self, text: str) -> bytes:
+        """Hash the full request so different models or task types never collide.
         
-        return text, len(text.split())
+        Runs of whitespace are collapsed first, so re-indented or reflowed
+        text reuses the embedding of the original instead of calling the API.
+        """
+        hasher = self._key_hasher.copy()
+        hasher.update(" ".join(text.split()).encode())
+        return hasher.digest()
+
+    def _memory_get(self, key: bytes) -> Optional[np.ndarray]:
+        """Return an embedding from the in-memory LRU and mark it most recently used."""
+        with self._cache_lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            return embedding
+
+    def _cache_get(self, key: bytes) -> Optional[np.ndarray]:
+        """Return a cached embedding and mark it most recently used.
+        
+        Falls back to the on-disk store, if configured, and promotes hits
+        from it into memory.
+        """
+        embedding = self._memory_get(key)
+        if embedding is not None or self._store is None:
+            return embedding
+        embedding = self._store.get(key)
+        if embedding is not None:
+            with self._cache_lock:
+                self.cache_hits += 1
+            self._remember(key, embedding)
+        return embedding
+
+    def _cache_put(self, key: bytes, embedding: np.ndarray) -> None:
+        """Cache a successful embedding in memory and in the on-disk store."""
+        self._cache_put_many({key: embedding})
+
+    def _cache_put_many(self, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """Cache successful embeddings, writing the on-disk store once."""
+        if self._store is not None and embeddings:
+            self._store.put_many(embeddings)
+        for key, embedding in embeddings.items():
+            self._remember(key, embedding)
+
+    def _remember(self, key: bytes, embedding: np.ndarray) -> None:
+        """Add an embedding to the in-memory LRU, evicting the least recently used."""
+        if self._cache_size <= 0:
+            return
+        # Cached arrays are shared between callers
+        embedding.setflags(write=False)
+        with self._cache_lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _next_client(self) -> int:
+        """Pick the next API key's client in rotation, skipping keys cooling down."""
+        with self._client_lock:
+            now = time.monotonic()
+            for _ in range(len(self.clients)):
+                index = next(self._client_order)
+                if self._cooldown_until[index] <= now:
+                    return index
+            # Every key is rate limited; wait for the one that recovers first
+            return min(range(len(self.clients)), key=self._cooldown_until.__getitem__)
+
+    def _embed_content(self, contents: Union[str, List[str]], embedding_config):
+        """Call the embedding API, backing off and retrying when rate limited.
+        
+        Requests rotate between the configured API keys. A key that returns
+        429 or 503 cools down with exponential backoff while the retry goes to
+        the next available key, waiting only when every key is cooling down.
+        Other errors and the final failed attempt are raised to the caller.
+        """
+        from google.genai import errors as genai_errors
+        for attempt in range(config.EMBEDDING_MAX_RETRIES + 1):
+            index = self._next_client()
+            wait = self._cooldown_until[index] - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return self.clients[index].models.embed_content(
+                    model=config.EMBEDDING_MODEL,
+                    contents=contents,
+                    config=embedding_config
+                )
+            except genai_errors.APIError as e:
+                if e.code not in (429, 503) or attempt == config.EMBEDDING_MAX_RETRIES:
+                    raise
+                delay = config.EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt)
+                self._cooldown_until[index] = time.monotonic() + delay
+                logger.warning(f"Embedding API returned {e.code} for key {index + 1}/{len(self.clients)}, "
+                               f"cooling it down for {delay:.1f}s")
 
-    def generate(self, content: str, description: str = "", filename: Optional[str] = None) -> List[float]:
+    def generate(self, content: str, description: str = "", filename: Optional[str] = None) -> np.ndarray:
         """Generate embeddings for content with optional description.
         
         Args:
@@ -100,7 +283,7 @@ class EmbeddingGenerator:
             filename: Optional filename being processed
             
         Returns:
-            List[float]: The generated embedding vector
+            np.ndarray: The generated float32 embedding vector
         """
         if filename:
             self.set_current_file(filename)
@@ -110,22 +293,22 @@ class EmbeddingGenerator:
                 # Prepare and truncate content
                 combined_text = f"{content}\n\nDescription: {description}" if description else content
                 truncated_text, tokens = self._truncate_text(combined_text)
+                cache_key = self._cache_key(truncated_text)
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    return cached
                 self._update_status_panel(
                     f"Processing content ({tokens} tokens)" + 
                     (" [truncated]" if truncated_text != combined_text else "")
                 )
                 
-                embedding_config = types.EmbedContentConfig(
+                embedding_config = _embed_config(
                     task_type=self.task_type
                 ) if self.task_type else None
                 
                 # Make API call
                 self._update_status_panel("Calling Gemini API...")
-                result = self.client.models.embed_content(
-                    model="gemini-embedding-exp-03-07",
-                    contents=truncated_text,
-                    config=embedding_config
-                )
+                result = self._embed_content(truncated_text, embedding_config)
                 
                 if not result or not result.embeddings:
                     self.failed_embeddings += 1
@@ -141,8 +324,8 @@ class EmbeddingGenerator:
                     self._update_status_panel("No embedding values in response", is_error=True)
                     return self.default_embedding
                 
-                embedding_values = [float(val) for val in values]
-                if len(embedding_values) != config.EMBEDDING_DIMENSION:
+                embedding_values = np.asarray(values, dtype=np.float32)
+                if embedding_values.shape != (config.EMBEDDING_DIMENSION,):
                     self.failed_embeddings += 1
                     self._update_status_panel(
                         f"Wrong embedding dimension: {len(embedding_values)} (expected {config.EMBEDDING_DIMENSION})", 
@@ -153,6 +336,7 @@ class EmbeddingGenerator:
                 # Update stats
                 self.successful_embeddings += 1
                 self.total_tokens += tokens
+                self._cache_put(cache_key, embedding_values)
                 self._update_status_panel("Successfully generated embedding")
                 return embedding_values
                 
@@ -163,82 +347,221 @@ class EmbeddingGenerator:
                 logger.error(f"Error generating embedding: {error_msg}")
                 return self.default_embedding
             
-    def generate_batch(self, items: List[tuple[str, str]], filenames: Optional[List[str]] = None) -> List[List[float]]:
+    def generate_batch(self, items: List[tuple[str, str]], filenames: Optional[List[str]] = None,
+                       batch_size: int = config.EMBEDDING_BATCH_SIZE,
+                       concurrency: int = config.EMBED_CONCURRENCY) -> np.ndarray:
         """Generate embeddings for multiple content items in batch.
         
+        Items are sent ``batch_size`` at a time, so each API call carries
+        as many texts as the endpoint accepts, with up to ``concurrency``
+        calls in flight on worker threads.
+        
         Args:
             items: List of (content, description) tuples
             filenames: Optional list of filenames being processed
+            batch_size: Maximum number of items per API call
+            concurrency: Maximum number of API calls in flight
             
         Returns:
-            List[List[float]]: List of embedding vectors
+            np.ndarray: float32 matrix with one embedding row per item, in the
+            order of ``items``
         """
         if filenames:
             self.set_current_file(f"Batch: {len(filenames)} files")
-        with Live(self.status_panel, refresh_per_second=4) as live:
-            try:
-                self._update_status_panel(f"Preparing batch of {len(items)} items...")
-                combined_texts = []
-                total_batch_tokens = 0
-                
-                for content, desc in items:
-                    text = f"{content}\n\nDescription: {desc}" if desc else content
-                    truncated_text, tokens = self._truncate_text(text)
-                    total_batch_tokens += tokens
-                    combined_texts.append(truncated_text)
-                
-                self._update_status_panel(f"Processing batch ({total_batch_tokens} total tokens)")
-                
-                embedding_config = types.EmbedContentConfig(
-                    task_type=self.task_type
-                ) if self.task_type else None
-                
-                # Make API call
-                self._update_status_panel("Calling Gemini API for batch...")
-                result = self.client.models.embed_content(
-                    model="gemini-embedding-exp-03-07",
-                    contents=combined_texts,
-                    config=embedding_config
-                )
-                
-                if not result or not result.embeddings:
-                    self.failed_embeddings += len(items)
-                    self._update_status_panel("No embeddings returned from API for batch", is_error=True)
-                    return [self.default_embedding] * len(items)
-                
-                # Process results
-                self._update_status_panel("Processing batch API response...")
-                embeddings = []
-                
-                for i, embedding_result in enumerate(result.embeddings):
-                    if not embedding_result.values:
-                        self.failed_embeddings += 1
-                        self._update_status_panel(f"No values for item {i} in batch", is_error=True)
-                        embeddings.append(self.default_embedding)
-                        continue
-                        
-                    values = [float(val) for val in embedding_result.values]
-                    if len(values) != config.EMBEDDING_DIMENSION:
-                        self.failed_embeddings += 1
-                        self._update_status_panel(
-                            f"Wrong dimension for item {i}: {len(values)}", 
-                            is_error=True
-                        )
-                        embeddings.append(self.default_embedding)
-                        continue
-                        
-                    self.successful_embeddings += 1
-                    embeddings.append(values)
-                
-                self.total_tokens += total_batch_tokens
-                self._update_status_panel(f"Successfully processed {len(embeddings)} embeddings")
-                return embeddings
-                
-            except Exception as e:
-                self.failed_embeddings += len(items)
-                error_msg = str(e)
-                self._update_status_panel(f"Batch Error: {error_msg}", is_error=True)
-                logger.error(f"Error generating batch embeddings: {error_msg}")
-                return [self.default_embedding] * len(items)
+        if not items:
+            return np.empty((0, config.EMBEDDING_DIMENSION), dtype=np.float32)
+        # Repeated items are embedded once, even when batches run in parallel
+        unique = list(dict.fromkeys(items))
+        self.duplicates_skipped += len(items) - len(unique)
+        # Only cache misses go to the API, so every call carries batch_size new texts
+        keys, cached, pending = self._partition(unique)
+        misses = list(pending.items())
+        batches = [OrderedDict(misses[i:i + batch_size]) for i in range(0, len(misses), batch_size)]
+        if concurrency <= 1 or len(batches) <= 1:
+            results = [self._embed_pending(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+                results = list(executor.map(self._embed_pending, batches))
+        fetched = {key: embedding for batch in results for key, embedding in batch.items()}
+        embeddings = {
+            item: embedding if embedding is not None else fetched.get(key, self.default_embedding)
+            for item, key, embedding in zip(unique, keys, cached)
+        }
+        return np.stack([embeddings[item] for item in items])
+        
+    def _partition(self, items: List[tuple[str, str]]
+                   ) -> tuple[List[bytes], List[Optional[np.ndarray]], "OrderedDict[bytes, tuple[str, int]]"]:
+        """Split (content, description) tuples into cache hits and texts to embed.
+        
+        Items missing from memory are looked up in the on-disk store together
+        rather than one query each.
+        
+        Returns:
+            Tuple containing:
+            - Cache key of each item
+            - Cached embedding of each item, or None on a miss
+            - Truncated text and token estimate of each unique miss, by key,
+              in first-seen order
+        """
+        keys = []
+        embeddings: List[Optional[np.ndarray]] = []
+        pending: "OrderedDict[bytes, tuple[str, int]]" = OrderedDict()
+        for content, desc in items:
+            text, tokens = self._truncate_text(f"{content}\n\nDescription: {desc}" if desc else content)
+            key = self._cache_key(text)
+            embedding = self._memory_get(key) if key not in pending else None
+            if embedding is None:
+                pending.setdefault(key, (text, tokens))
+            keys.append(key)
+            embeddings.append(embedding)
+        
+        if pending and self._store is not None:
+            stored = self._store.get_many(list(pending))
+            for key, embedding in stored.items():
+                self._remember(key, embedding)
+                del pending[key]
+            if stored:
+                for i, key in enumerate(keys):
+                    if embeddings[i] is None and key in stored:
+                        embeddings[i] = stored[key]
+                        self.cache_hits += 1
+        
+        self.duplicates_skipped += sum(embedding is None for embedding in embeddings) - len(pending)
+        return keys, embeddings, pending
+
+    def _embed_batch(self, items: List[tuple[str, str]]) -> List[np.ndarray]:
+        """Embed one batch of (content, description) tuples with a single API call.
+        
+        Cached texts, and repeats of a text within the batch, are not sent.
+        """
+        keys, embeddings, pending = self._partition(items)
+        fetched = self._embed_pending(pending) if pending else {}
+        return [
+            embedding if embedding is not None else fetched.get(key, self.default_embedding)
+            for key, embedding in zip(keys, embeddings)
+        ]
+
+    def _embed_pending(self, pending: "OrderedDict[bytes, tuple[str, int]]") -> dict:
+        """Embed unique cache misses from _partition with a single API call.
+        
+        Returns:
+            Dict of the embeddings that succeeded, by cache key
+        """
+        try:
+            total_batch_tokens = sum(tokens for _, tokens in pending.values())
+            self._update_status_panel(f"Processing batch ({total_batch_tokens} total tokens)")
+            
+            embedding_config = _embed_config(
+                task_type=self.task_type
+            ) if self.task_type else None
+            
+            # Make API call
+            self._update_status_panel("Calling Gemini API for batch...")
+            result = self._embed_content([text for text, _ in pending.values()], embedding_config)
             
+            if not result or not result.embeddings:
+                self._update_status_panel("No embeddings returned from API for batch", is_error=True)
+                api_results = []
+            else:
+                api_results = result.embeddings
+            
+            # Process results; missing or invalid entries are left out
+            fetched = {}
+            for i, key in enumerate(pending):
+                values = api_results[i].values if i < len(api_results) else None
+                if not values:
+                    self.failed_embeddings += 1
+                    self._update_status_panel(f"No values for item {i} in batch", is_error=True)
+                    continue
+                    
+                values = np.asarray(values, dtype=np.float32)
+                if values.shape != (config.EMBEDDING_DIMENSION,):
+                    self.failed_embeddings += 1
+                    self._update_status_panel(
+                        f"Wrong dimension for item {i}: {len(values)}", 
+                        is_error=True
+                    )
+                    continue
+                    
+                self.successful_embeddings += 1
+                fetched[key] = values
+            self._cache_put_many(fetched)
+            
+            self.total_tokens += total_batch_tokens
+            self._update_status_panel(f"Successfully processed {len(fetched)} embeddings")
+            
+        except Exception as e:
+            self.failed_embeddings += len(pending)
+            error_msg = str(e)
+            self._update_status_panel(f"Batch Error: {error_msg}", is_error=True)
+            logger.error(f"Error generating batch embeddings: {error_msg}")
+            fetched = {}
+            
+        return fetched
 
+    async def generate_async(self, content: str, description: str = "") -> np.ndarray:
+        """Generate an embedding without blocking the event loop.
+        
+        Args:
+            content: The main text to generate embeddings for
+            description: Optional description or context for the content
+            
+        Returns:
+            np.ndarray: The generated float32 embedding vector
+        """
+        return await asyncio.to_thread(self.generate, content, description)
+
+    async def generate_many(self, items: List[tuple[str, str]],
+                            concurrency: int = config.EMBED_CONCURRENCY,
+                            batch_size: int = config.EMBEDDING_BATCH_SIZE,
+                            on_batch: Optional[Callable[[int, List[np.ndarray]], None]] = None) -> List[np.ndarray]:
+        """Generate embeddings for many items with concurrent batched requests.
+        
+        Cached items are resolved up front and only the unique cache misses
+        are split into batches of ``batch_size``, so each API call is full
+        and a text repeated across batches is sent once. Up to
+        ``concurrency`` batch requests are in flight at once.
+        
+        Args:
+            items: List of (content, description) tuples
+            concurrency: Maximum number of batch requests in flight
+            batch_size: Maximum number of texts per API call
+            on_batch: Optional callback receiving the index of a run of
+                consecutive items and their embeddings, at most ``batch_size``
+                at a time, as soon as those items and every item before them
+                are done, so results arrive in input order
+            
+        Returns:
+            List[np.ndarray]: float32 embedding vectors, in the order of ``items``
+        """
+        keys, embeddings, pending = self._partition(items)
+        misses = list(pending.items())
+        batches = [OrderedDict(misses[i:i + batch_size]) for i in range(0, len(misses), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        fetched: dict = {}
+        delivered = 0
+        
+        def deliver() -> None:
+            nonlocal delivered
+            # Fill in every item from the last delivered one that is now done
+            ready = delivered
+            while ready < len(items) and (embeddings[ready] is not None or keys[ready] in fetched):
+                if embeddings[ready] is None:
+                    embeddings[ready] = fetched[keys[ready]]
+                ready += 1
+            if on_batch:
+                for start in range(delivered, ready, batch_size):
+                    on_batch(start, embeddings[start:min(start + batch_size, ready)])
+            delivered = ready
+        
+        async def embed(batch: "OrderedDict[bytes, tuple[str, int]]") -> None:
+            async with semaphore:
+                results = await asyncio.to_thread(self._embed_pending, batch)
+            for key in batch:
+                fetched[key] = results.get(key, self.default_embedding)
+            deliver()
+        
+        # Items served from the cache before the first miss are ready now
+        deliver()
+        await asyncio.gather(*(embed(batch) for batch in batches))
+        return embeddings
@@ -2,11 +2,7 @@
 import os
 from typing import Optional
 import click
-from rich.console import Console
-from git import Repo, exc as git_exc
-from .database_manager import DatabaseManager
-from .processors.local import LocalFileProcessor
-from .embedding import EmbeddingGenerator
+from ._console import console
 
 @click.command()
 @click.argument('repo_name', type=str, required=False)
@@ -21,28 +17,28 @@ def main(repo_name: Optional[str] = None, path: Optional[str] = None, whole_file
         path: Path to repository (defaults to current directory)
         whole_file: If True, embed complete files instead of individual constructs
     """
-    console = Console()
-    
-    console = Console()
     try:
-        # Initialize components
-        console.print("[bold cyan]Initializing...[/bold cyan]")
-        db_manager = DatabaseManager()
-        db_manager.init_db()
-        embedding_gen = EmbeddingGenerator()
+        from .cli.repo import RepoCLI
         
         # Determine repository path and name
         repo_path = os.path.abspath(path if path else os.getcwd())
         if not repo_name:
             repo_name = os.path.basename(repo_path)
 
-        # Validate repository
-        try:
-            repo = Repo(repo_path)
-            if repo.bare:
-                raise click.UsageError("Cannot process bare repository")
-        except git_exc.InvalidGitRepositoryError:
-            raise click.UsageError("Not a git repository")
+        # Validate repository with one git call instead of loading it with GitPython
+        RepoCLI.validate_repo(repo_path)
+        
+        # Imported here so --help and an invalid path return without loading
+        # the database, parser and Gemini SDK modules
+        from .database_manager import DatabaseManager
+        from .processors.local import LocalFileProcessor
+        from .embedding import EmbeddingGenerator
+        
+        # Initialize components
+        console.print("[bold cyan]Initializing...[/bold cyan]")
+        db_manager = DatabaseManager()
+        db_manager.init_db()
+        embedding_gen = EmbeddingGenerator()
 
         console.print(f"[bold green]Processing repository:[/bold green] {repo_name}")
         console.print(f"[bold green]Path:[/bold green] {repo_path}")
@@ -50,20 +46,17 @@ def main(repo_name: Optional[str] = None, path: Optional[str] = None, whole_file
         # Initialize processor
         processor = LocalFileProcessor(
             repo_path=repo_path,
-            embedding_generator=embedding_gen
+            embedding_generator=embedding_gen,
+            repository=repo_name
         )
         
-        # Process repository
-        constructs_with_embeddings, imports = processor.process()
-        
-        # Add repository info to constructs
-        for construct, _ in constructs_with_embeddings:
-            construct.repository = repo_name
-        
-        # Store results
+        # Process repository; files are parsed in worker processes and each
+        # embedded batch is stored by a background thread while later
+        # batches are still being embedded
+        with db_manager.background_store() as store:
+            constructs_with_embeddings, imports = processor.process(on_embedded=store)
         if constructs_with_embeddings:
-            console.print("[bold cyan]Storing results in database...[/bold cyan]")
-            db_manager.store_constructs(constructs_with_embeddings)
+            console.print(f"[bold green]Stored {len(constructs_with_embeddings)} constructs[/bold green]")
             
         console.print("\n[bold green]Processing completed successfully![/bold green]")
             
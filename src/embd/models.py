@@ -1,20 +1,51 @@
 """Models for data validation and database operations."""
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import functools
+import itertools
+import operator
+from typing import Annotated, List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+import numpy as np
 from sqlalchemy import Column, String, Integer, DateTime, Float, func, Text
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.sql.expression import cast
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import select, text
+from pgvector import HalfVector
+from pgvector.sqlalchemy import Vector, HALFVEC
+from sqlalchemy import select, text, bindparam, true, type_coerce
 from .database_base import Base
-from pydantic import BaseModel, Field
+from . import config
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, PlainSerializer
 
 # =============================================================================
 # Pydantic Models for Request/Response Validation
 # =============================================================================
 
+# Embedding vectors are held as contiguous float32 arrays rather than lists of
+# Python floats, which take seven times the memory; JSON output gets a list
+Embedding = Annotated[
+    np.ndarray,
+    BeforeValidator(lambda value: np.asarray(value, dtype=np.float32)),
+    PlainSerializer(lambda value: value.tolist(), return_type=List[float], when_used='json'),
+]
+
+def _utcnow() -> datetime:
+    """Current time as a timezone-aware UTC datetime, matching the timestamptz columns."""
+    return datetime.now(timezone.utc)
+
+def unit_vector(embedding) -> np.ndarray:
+    """Scale an embedding to unit length as a float32 array.
+    
+    Stored and query vectors are both normalized, so their inner product is
+    their cosine similarity. All-zero placeholder embeddings are returned
+    unchanged.
+    """
+    embedding = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm else embedding
+
 class CodeConstruct(BaseModel):
     """Pydantic model for request/response validation."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
     filename: str = Field(description="Source filename of the code construct")
     repository: str = Field(description="Name of the repository containing the code")
     git_commit: str = Field(description="Git commit hash of last change")
@@ -22,11 +53,37 @@ class CodeConstruct(BaseModel):
     construct_type: str = Field(description="Type of code construct (e.g. function, class)")
     name: str = Field(description="Name of the function or class")
     description: str = Field(description="AI-generated description of the code construct")
-    embedding: List[float] = Field(description="Vector embedding of the code and description")
+    embedding: Embedding = Field(description="Vector embedding of the code and description")
     line_start: int = Field(description="Starting line number in source file")
     line_end: int = Field(description="Ending line number in source file")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare fields, using np.array_equal for the embedding array.
+        
+        BaseModel's __eq__ compares field dicts, and comparing ndarrays with
+        == does not give a single bool.
+        """
+        if not isinstance(other, CodeConstruct):
+            return NotImplemented
+        if type(self) is not type(other):
+            return False
+        fields = {key: value for key, value in self.__dict__.items() if key != 'embedding'}
+        other_fields = {key: value for key, value in other.__dict__.items() if key != 'embedding'}
+        return fields == other_fields and np.array_equal(
+            self.__dict__.get('embedding'), other.__dict__.get('embedding')
+        )
+
+    @property
+    def construct_id(self) -> str:
+        """Primary key of this construct in code_embeddings.
+        
+        Includes the repository to avoid collisions across repos. Built on
+        every access rather than cached, so it always reflects the current
+        fields, including after assignment or model_copy(update=...).
+        """
+        return f"{self.repository}:{self.filename}:{self.name}:{self.construct_type}"
 
     @classmethod
     def from_search_result(cls, result: Dict[str, Any]) -> 'CodeConstruct':
@@ -75,8 +132,8 @@ class CodeConstruct(BaseModel):
             embedding=result.get('embedding', []),  # Optional
             line_start=result['line_start'],
             line_end=result['line_end'],
-            created_at=created_at or datetime.utcnow(),
-            updated_at=updated_at or datetime.utcnow()
+            created_at=created_at or _utcnow(),
+            updated_at=updated_at or _utcnow()
         )
 
 class Import(BaseModel):
@@ -88,16 +145,56 @@ class Import(BaseModel):
     line_start: int = Field(description="Starting line number in source file")
     line_end: int = Field(description="Ending line number in source file")
     git_commit: str = Field(description="Git commit hash of last change")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 # =============================================================================
 # SQLAlchemy Models for Database Operations
 # =============================================================================
 
+class _HalfvecArray(HALFVEC):
+    """halfvec column read straight into a float32 numpy array.
+    
+    pgvector's HALFVEC decodes each value into a list of Python floats; this
+    parses the text form with numpy instead, avoiding one float object per
+    dimension. Writes are unchanged.
+    """
+    cache_ok = True
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None:
+                return None
+            if isinstance(value, HalfVector):
+                return value.to_numpy().astype(np.float32)
+            return np.fromstring(value[1:-1], dtype=np.float32, sep=',')
+        return process
+
 class CodeEmbedding(Base):
     """SQLAlchemy model for storing code embeddings and metadata."""
     __tablename__ = 'code_embeddings'
+    
+    # Name of the HNSW index used for similarity search
+    VECTOR_INDEX = 'idx_code_embeddings_embedding_hnsw'
+    
+    # Stored as the table comment when the schema is created; bump when the
+    # table definition changes so stale databases are detected
+    SCHEMA_VERSION = 'embd-schema-4'
+    
+    # Transaction-level advisory lock key serializing schema creation
+    SCHEMA_LOCK_ID = 0x656D6264  # 'embd'
+    
+    # Older versions that only lack tables create_all can add in place;
+    # embeddings stored before schema 4 are not normalized
+    COMPATIBLE_SCHEMA_VERSIONS = ()
+    
+    # CodeConstruct fields copied as-is into columns of the same name
+    CONSTRUCT_COLUMNS = (
+        'filename', 'repository', 'git_commit', 'code', 'construct_type',
+        'name', 'description', 'line_start', 'line_end'
+    )
+    # Reads all of them in one call when building a row
+    _construct_values = operator.attrgetter(*CONSTRUCT_COLUMNS)
 
     # Primary key as concatenation of filename + name + type
     id = Column(Text, primary_key=True)
@@ -111,8 +208,10 @@ class CodeEmbedding(Base):
     name = Column(String)
     description = Column(Text)
     
-    # Vector embedding (3072 dimensions for Gemini embedding model)
-    embedding = Column(Vector(3072))
+    # Vector embedding (3072 dimensions for Gemini embedding model), stored as
+    # halfvec (fp16) to halve table and index size versus a float32 vector,
+    # and normalized to unit length so similarity is a plain inner product
+    embedding = Column(HALFVEC(config.EMBEDDING_DIMENSION))
     
     # Location information
     line_start = Column(Integer, nullable=False)
@@ -120,13 +219,20 @@ class CodeEmbedding(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     @classmethod
     def create_indexes(cls, engine):
-        """Create necessary indexes including vector similarity index if they don't exist."""
-        # Enable pgvector extension if not already enabled
+        """Create necessary indexes including vector similarity index if they don't exist.
+        
+        Runs in one transaction holding an advisory lock, so workers starting
+        together create the schema once instead of racing on the DDL; the
+        ones that wait then find the table and skip the index creation.
+        """
         with engine.connect() as conn:
+            conn.execute(text(f"SELECT pg_advisory_xact_lock({cls.SCHEMA_LOCK_ID})"))
+            
+            # Enable pgvector extension if not already enabled
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
             
             # Check if table exists first
@@ -135,9 +241,24 @@ class CodeEmbedding(Base):
             ))
             table_exists = result.scalar()
             
-            if not table_exists:
-                # Create tables via SQLAlchemy only if they don't exist
-                Base.metadata.create_all(engine)
+            if table_exists:
+                # Add tables introduced since the schema was created and
+                # record the upgrade if nothing else changed
+                Base.metadata.create_all(conn)
+                version = conn.execute(text(
+                    "SELECT obj_description('code_embeddings'::regclass, 'pg_class')"
+                )).scalar()
+                if version in cls.COMPATIBLE_SCHEMA_VERSIONS:
+                    conn.execute(text(
+                        f"COMMENT ON TABLE code_embeddings IS '{cls.SCHEMA_VERSION}'"
+                    ))
+            else:
+                # Create tables via SQLAlchemy only if they don't exist, on this
+                # connection so the uncommitted extension types are visible
+                Base.metadata.create_all(conn)
+                conn.execute(text(
+                    f"COMMENT ON TABLE code_embeddings IS '{cls.SCHEMA_VERSION}'"
+                ))
                 
                 # Create additional indexes
                 conn.execute(text("""
@@ -151,67 +272,169 @@ class CodeEmbedding(Base):
                     CREATE INDEX IF NOT EXISTS idx_code_embeddings_construct_type 
                     ON code_embeddings(construct_type);
                     
-                    -- Composite index for repository+filename lookups
-                    CREATE INDEX IF NOT EXISTS idx_code_embeddings_repo_file
-                    ON code_embeddings(repository, filename);
-                    
-                    -- IVF index for fast similarity search (optional)
-                    -- CREATE INDEX IF NOT EXISTS idx_code_embeddings_embedding 
-                    -- ON code_embeddings USING ivfflat (embedding vector_cosine_ops)
-                    -- WITH (lists = 100);
+                    -- Covering index for repository+filename lookups, so
+                    -- listing a file's constructs is an index-only scan
+                    CREATE INDEX IF NOT EXISTS idx_code_embeddings_repo_file_cov
+                    ON code_embeddings(repository, filename)
+                    INCLUDE (id, name, construct_type, line_start, line_end);
                 """))
+                # HNSW index for similar_code; building it on the empty table
+                # is instant, and bulk_store rebuilds it after the first load
+                cls.create_vector_index(conn)
             conn.commit()
     
     @classmethod
-    def store_embedding(cls, session, construct: CodeConstruct, embedding: List[float]) -> None:
-        """Store or update a code construct with its embedding."""
-        # Generate unique ID - include repository to avoid collisions across repos
-        construct_id = f"{construct.repository}:{construct.filename}:{construct.name}:{construct.construct_type}"
-        
-        # Check if construct exists
-        instance = session.query(cls).filter_by(id=construct_id).first()
-        
-        if instance:
-            # Update existing
-            for key, value in construct.model_dump().items():
-                if key != 'created_at' and hasattr(instance, key):
-                    setattr(instance, key, value)
-            instance.embedding = embedding
-            instance.updated_at = datetime.utcnow()
-        else:
-            # Create new
-            instance = cls(
-                id=construct_id,
-                embedding=embedding,
-                **construct.model_dump(exclude={'created_at', 'updated_at', 'embedding'})
-            )
-            session.add(instance)
+    def create_vector_index(cls, conn) -> None:
+        """Create the HNSW index used by similar_code if it doesn't exist."""
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {cls.VECTOR_INDEX}
+            ON code_embeddings
+            USING hnsw (embedding halfvec_ip_ops)
+            WITH (m = {config.HNSW_M}, ef_construction = {config.HNSW_EF_CONSTRUCTION});
+        """))
     
     @classmethod
-    def similar_code(cls, session, query_embedding: List[float], limit: int = 5,
-                    min_similarity: float = 0.7, include_code: bool = True,
-                    include_description: bool = True, include_embedding: bool = False,
-                    for_reconstruction: bool = False) -> List[dict]:
-        """Find similar code constructs using vector similarity search.
+    def _embedding_array(cls):
+        """The embedding column, selected as float32 numpy arrays."""
+        return type_coerce(cls.embedding, _HalfvecArray(config.EMBEDDING_DIMENSION)).label('embedding')
+    
+    @staticmethod
+    def make_id(construct: CodeConstruct) -> str:
+        """Primary key for a construct (see CodeConstruct.construct_id)."""
+        return construct.construct_id
+    
+    @classmethod
+    def _row(cls, construct: CodeConstruct, embedding: np.ndarray) -> Dict[str, Any]:
+        """Column values for a construct, read directly instead of through model_dump."""
+        row = dict(zip(cls.CONSTRUCT_COLUMNS, cls._construct_values(construct)))
+        row['id'] = construct.construct_id
+        row['embedding'] = unit_vector(embedding)
+        return row
+    
+    @classmethod
+    def store_embedding(cls, session, construct: CodeConstruct, embedding: np.ndarray) -> None:
+        """Store or update a code construct with its embedding.
         
-        Args:
-            session: SQLAlchemy session
-            query_embedding: Vector to compare against
-            limit: Maximum number of results to return
-            min_similarity: Minimum similarity threshold (0-1)
-            include_code: Whether to include code content in results
-            include_description: Whether to include descriptions in results
-            include_embedding: Whether to include embeddings in results
-            for_reconstruction: If True, returns all fields needed for CodeConstruct
+        Issues a single INSERT ... ON CONFLICT so PostgreSQL decides between
+        insert and update, instead of selecting the row first. For more than
+        a handful of constructs use bulk_upsert, which writes them with one
+        statement per batch.
+        """
+        session.execute(cls.upsert_statement([cls._row(construct, embedding)]))
+    
+    @classmethod
+    def upsert_statement(cls, rows: List[Dict[str, Any]]):
+        """Build one multi-row INSERT ... ON CONFLICT (id) DO UPDATE for rows.
+        
+        Every row must have the same keys, including ``id``; on conflict all
+        other columns are overwritten and ``updated_at`` is refreshed.
+        """
+        stmt = pg_insert(cls.__table__).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[cls.__table__.c.id],
+            set_={
+                **{column: stmt.excluded[column] for column in rows[0] if column != 'id'},
+                'updated_at': func.now()
+            }
+        )
+    
+    @classmethod
+    def bulk_upsert(cls, session, pairs: List[Tuple[CodeConstruct, np.ndarray]],
+                    batch_size: int = 500) -> int:
+        """Store or update many constructs with one statement per batch_size rows.
+        
+        Replaces a store_embedding call per construct. When an id repeats the
+        last construct wins, as it would with sequential calls.
         
         Returns:
-            List of dictionaries containing matched code constructs
+            Number of distinct constructs written
+        """
+        rows = {}
+        for construct, embedding in pairs:
+            row = cls._row(construct, embedding)
+            rows[row['id']] = row
+        values = list(rows.values())
+        for start in range(0, len(values), batch_size):
+            session.execute(cls.upsert_statement(values[start:start + batch_size]))
+        return len(values)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _similar_code_statement(cls, include_code: bool, include_description: bool,
+                                include_embedding: bool, for_reconstruction: bool,
+                                filter_type: bool = False):
+        """Build the similarity search statement for one combination of flags.
+        
+        The query vector, distance bound, limit and construct type are bind
+        parameters (``query_embedding``, ``max_distance``, ``limit``,
+        ``construct_type``), so each of the few possible statements is built
+        once and reused from SQLAlchemy's compiled statement cache.
+        
+        Vectors are stored at unit length, so the negative inner product
+        (``<#>``) orders rows exactly as cosine distance would without
+        dividing by both norms. The nearest rows are selected in a subquery
+        that orders by the distance as an output column, so it is computed once per row (by
+        the index scan when there is one); the outer query derives the
+        similarity and applies the distance bound to that column. The bound
+        keeps a prefix of the ordered rows, so filtering after the LIMIT
+        returns the same rows as filtering before it.
+        """
+        query_vector = bindparam("query_embedding", type_=HALFVEC(config.EMBEDDING_DIMENSION))
+        nearest = cls._nearest_statement(
+            query_vector, include_code, include_description, include_embedding, for_reconstruction,
+            filter_type
+        ).subquery('nearest')
+        
+        return (
+            select(*(column for column in nearest.c if column.key != 'distance'),
+                   (-nearest.c.distance).label('similarity'))
+            .where(nearest.c.distance < bindparam("max_distance", type_=Float))
+            .order_by(nearest.c.distance)
+        )
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _similar_code_batch_statement(cls, include_code: bool, include_description: bool,
+                                      include_embedding: bool, for_reconstruction: bool,
+                                      filter_type: bool = False):
+        """Build the statement searching for several query vectors at once.
+        
+        The vectors are bound as one halfvec array (``query_embeddings``) and
+        unnested with their 1-based position as ``idx``; a LATERAL subquery
+        runs the same bounded nearest-neighbour search as
+        _similar_code_statement for each of them.
         """
-        # Cast query embedding array to vector
-        vector_param = cast(query_embedding, Vector)
+        queries = func.unnest(
+            bindparam("query_embeddings", type_=ARRAY(HALFVEC(config.EMBEDDING_DIMENSION)))
+        ).table_valued('embedding', with_ordinality='idx').render_derived('queries')
+        nearest = cls._nearest_statement(
+            queries.c.embedding, include_code, include_description, include_embedding,
+            for_reconstruction, filter_type
+        ).lateral('nearest')
         
-        # Calculate cosine similarity
-        similarity = (1 - func.cosine_distance(cls.embedding, vector_param)).cast(Float)
+        return (
+            select(queries.c.idx,
+                   *(column for column in nearest.c if column.key != 'distance'),
+                   (-nearest.c.distance).label('similarity'))
+            .select_from(queries)
+            .join(nearest, true())
+            .where(nearest.c.distance < bindparam("max_distance", type_=Float))
+            .order_by(queries.c.idx, nearest.c.distance)
+        )
+    
+    @classmethod
+    def _nearest_statement(cls, query_vector, include_code: bool, include_description: bool,
+                           include_embedding: bool, for_reconstruction: bool, filter_type: bool):
+        """Select the ``limit`` rows nearest query_vector with their ``distance``.
+        
+        Only named columns are selected, never the mapped class. The
+        embedding (about 6KB of halfvec per row) is fetched only when it is
+        requested or needed for reconstruction, and the code and
+        description text only when requested, so a default search moves a
+        few hundred bytes per row.
+        """
+        # Negative inner product between stored embeddings and the query vector
+        distance = cls.embedding.max_inner_product(query_vector).label('distance')
         
         # Build query dynamically based on requested fields
         query_fields = [
@@ -222,7 +445,7 @@ class CodeEmbedding(Base):
             cls.name,
             cls.line_start,
             cls.line_end,
-            similarity.label('similarity')
+            distance
         ]
         
         if include_code or for_reconstruction:
@@ -230,7 +453,7 @@ class CodeEmbedding(Base):
         if include_description or for_reconstruction:
             query_fields.append(cls.description)
         if include_embedding or for_reconstruction:
-            query_fields.append(cls.embedding)
+            query_fields.append(cls._embedding_array())
         if for_reconstruction:
             query_fields.extend([
                 cls.git_commit,
@@ -238,33 +461,284 @@ class CodeEmbedding(Base):
                 cls.updated_at
             ])
         
-        results = (
-            session.query(*query_fields)
-            .filter(similarity > min_similarity)
-            .order_by(similarity.desc())
-            .limit(limit)
-            .all()
+        nearest = select(*query_fields)
+        if filter_type:
+            nearest = nearest.where(cls.construct_type == bindparam("construct_type", type_=String))
+        return nearest.order_by(distance).limit(bindparam("limit", type_=Integer))
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _constructs_by_type_statement(cls, include_code: bool, include_description: bool,
+                                      include_embedding: bool):
+        """Build the construct-type lookup statement for one combination of flags.
+        
+        The construct type and limit are bind parameters (``construct_type``,
+        ``limit``), so each of the eight possible statements is built once.
+        """
+        query_fields = [
+            cls.id,
+            cls.filename,
+            cls.repository,
+            cls.construct_type,
+            cls.name,
+            cls.line_start,
+            cls.line_end,
+            cls.git_commit
+        ]
+        
+        if include_code:
+            query_fields.append(cls.code)
+        if include_description:
+            query_fields.append(cls.description)
+        if include_embedding:
+            query_fields.append(cls._embedding_array())
+        
+        return select(*query_fields).where(
+            cls.construct_type == bindparam("construct_type", type_=String)
+        ).limit(bindparam("limit", type_=Integer))
+    
+    @staticmethod
+    def _similar_code_params(limit: int, min_similarity: float,
+                             construct_type: Optional[str] = None) -> Dict[str, Any]:
+        """Bind parameter values for a similarity search statement, except the query vectors."""
+        # similarity > min_similarity  <=>  distance < -min_similarity
+        params = {
+            "max_distance": -min_similarity,
+            "limit": limit
+        }
+        if construct_type:
+            params["construct_type"] = construct_type
+        return params
+    
+    @classmethod
+    def similar_code_query(cls, query_embedding: List[float], limit: int = 5,
+                           min_similarity: float = 0.7, include_code: bool = True,
+                           include_description: bool = True, include_embedding: bool = False,
+                           for_reconstruction: bool = False, construct_type: Optional[str] = None):
+        """Build the vector similarity search statement used by similar_code.
+        
+        The statement orders by the bare ``embedding <#> :query`` distance and
+        expresses ``min_similarity`` as a distance bound on the same value,
+        so the planner can serve it from a pgvector index instead of a
+        sequential scan and top-N sort.
+        
+        Args:
+            query_embedding: Vector to compare against
+            limit: Maximum number of results to return
+            min_similarity: Minimum similarity threshold (0-1)
+            include_code: Whether to include code content in results
+            include_description: Whether to include descriptions in results
+            include_embedding: Whether to include embeddings in results
+            for_reconstruction: If True, selects all fields needed for CodeConstruct
+            construct_type: Optional construct type to restrict results to
+        
+        Returns:
+            SQLAlchemy Select statement with its parameters bound
+        """
+        stmt = cls._similar_code_statement(
+            include_code, include_description, include_embedding, for_reconstruction,
+            bool(construct_type)
+        )
+        return stmt.params(query_embedding=unit_vector(query_embedding),
+                           **cls._similar_code_params(limit, min_similarity, construct_type))
+    
+    @classmethod
+    def similar_code(cls, session, query_embedding: List[float], limit: int = 5,
+                    min_similarity: float = 0.7, include_code: bool = True,
+                    include_description: bool = True, include_embedding: bool = False,
+                    for_reconstruction: bool = False, construct_type: Optional[str] = None) -> List[dict]:
+        """Find similar code constructs using vector similarity search.
+        
+        Args:
+            session: SQLAlchemy session
+            query_embedding: Vector to compare against
+            limit: Maximum number of results to return
+            min_similarity: Minimum similarity threshold (0-1)
+            include_code: Whether to include code content in results
+            include_description: Whether to include descriptions in results
+            include_embedding: Whether to include embeddings in results
+            for_reconstruction: If True, returns all fields needed for CodeConstruct
+            construct_type: Optional construct type to restrict results to
+        
+        Returns:
+            List of dictionaries containing matched code constructs; embeddings
+            are float32 numpy arrays
+        """
+        stmt = cls._similar_code_statement(
+            include_code, include_description, include_embedding, for_reconstruction,
+            bool(construct_type)
         )
+        results = session.execute(stmt, {
+            "query_embedding": unit_vector(query_embedding),
+            **cls._similar_code_params(limit, min_similarity, construct_type)
+        }).all()
         
-        return [
-            {
-                'id': result.id,
-                'repository': result.repository,  # Always include repository
-                'filename': result.filename,
-                'type': result.construct_type,
-                'name': result.name,
-                'line_start': result.line_start,
-                'line_end': result.line_end,
-                'similarity': float(result.similarity),
-                **({"code": result.code} if (include_code or for_reconstruction) else {}),
-                **({"description": result.description} if (include_description or for_reconstruction) else {}),
-                **({"embedding": result.embedding} if (include_embedding or for_reconstruction) else {}),
-                **({"git_commit": result.git_commit,
-                    "created_at": result.created_at,
-                    "updated_at": result.updated_at,
-                    "model_type": "CodeConstruct",  # For reconstruction hint
-                    "construct_type": result.construct_type  # Original type
-                    } if for_reconstruction else {})
-            }
-            for result in results
+        return cls._similar_code_records(
+            results, include_code, include_description, include_embedding, for_reconstruction
+        )
+    
+    @classmethod
+    def similar_code_batch(cls, session, query_embeddings: List[List[float]], limit: int = 5,
+                           min_similarity: float = 0.7, include_code: bool = True,
+                           include_description: bool = True, include_embedding: bool = False,
+                           for_reconstruction: bool = False,
+                           construct_type: Optional[str] = None) -> List[List[dict]]:
+        """Run similar_code for several query vectors in one statement.
+        
+        Saves a round-trip per query when re-ranking or answering many
+        queries: the vectors are sent as one array and each is searched by a
+        LATERAL subquery, so every search can still use the HNSW index.
+        
+        Args:
+            session: SQLAlchemy session
+            query_embeddings: Vectors to compare against
+            limit: Maximum number of results per query vector
+            (other arguments as for similar_code)
+        
+        Returns:
+            One list of results per query vector, in the order given, each
+            shaped and ordered like the results of similar_code
+        """
+        if not query_embeddings:
+            return []
+        stmt = cls._similar_code_batch_statement(
+            include_code, include_description, include_embedding, for_reconstruction,
+            bool(construct_type)
+        )
+        results = session.execute(stmt, {
+            "query_embeddings": [unit_vector(embedding) for embedding in query_embeddings],
+            **cls._similar_code_params(limit, min_similarity, construct_type)
+        }).all()
+        
+        # Rows arrive ordered by query position (1-based idx)
+        grouped = [[] for _ in query_embeddings]
+        for idx, rows in itertools.groupby(results, key=operator.attrgetter('idx')):
+            grouped[idx - 1] = cls._similar_code_records(
+                rows, include_code, include_description, include_embedding, for_reconstruction
+            )
+        return grouped
+    
+    @classmethod
+    def similar_code_np(cls, session, query_embedding: List[float], limit: int = 5,
+                        min_similarity: float = 0.7, include_code: bool = False,
+                        include_description: bool = False,
+                        construct_type: Optional[str] = None) -> Tuple[List[dict], np.ndarray]:
+        """Find similar code constructs and return their embeddings as one matrix.
+        
+        For callers doing further vector math on the results (re-ranking,
+        MMR, pairwise similarities), which can then work on a single array.
+        
+        Args:
+            (as for similar_code)
+        
+        Returns:
+            Tuple of the result dictionaries, without an ``embedding`` key,
+            and a float32 array of shape (len(results), EMBEDDING_DIMENSION)
+            whose rows are their embeddings
+        """
+        records = cls.similar_code(
+            session, query_embedding, limit=limit, min_similarity=min_similarity,
+            include_code=include_code, include_description=include_description,
+            include_embedding=True, construct_type=construct_type
+        )
+        embeddings = np.empty((len(records), config.EMBEDDING_DIMENSION), dtype=np.float32)
+        for i, record in enumerate(records):
+            embeddings[i] = record.pop('embedding')
+        return records, embeddings
+    
+    @classmethod
+    def _similar_code_records(cls, results, include_code: bool, include_description: bool,
+                              include_embedding: bool, for_reconstruction: bool) -> List[dict]:
+        """Shape similarity search rows into result dictionaries."""
+        keys, values = cls._similar_code_fields(
+            include_code, include_description, include_embedding, for_reconstruction
+        )
+        records = []
+        for result in results:
+            record = dict(zip(keys, values(result)))
+            record['similarity'] = float(record['similarity'])
+            if 'embedding' in record:
+                record['embedding'] = np.asarray(record['embedding'], dtype=np.float32)
+            if for_reconstruction:
+                record['model_type'] = "CodeConstruct"  # For reconstruction hint
+            records.append(record)
+        return records
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _similar_code_fields(include_code: bool, include_description: bool,
+                             include_embedding: bool, for_reconstruction: bool
+                             ) -> Tuple[Tuple[str, ...], operator.attrgetter]:
+        """Result keys for one combination of flags, with a getter for their row columns.
+        
+        Built once per combination so similar_code assembles each result with
+        a single zip instead of merging optional dicts per row.
+        """
+        # (result key, row column); repository is always included
+        fields = [
+            ('id', 'id'),
+            ('repository', 'repository'),
+            ('filename', 'filename'),
+            ('type', 'construct_type'),
+            ('name', 'name'),
+            ('line_start', 'line_start'),
+            ('line_end', 'line_end'),
+            ('similarity', 'similarity'),
         ]
+        if include_code or for_reconstruction:
+            fields.append(('code', 'code'))
+        if include_description or for_reconstruction:
+            fields.append(('description', 'description'))
+        if include_embedding or for_reconstruction:
+            fields.append(('embedding', 'embedding'))
+        if for_reconstruction:
+            fields.extend([
+                ('git_commit', 'git_commit'),
+                ('created_at', 'created_at'),
+                ('updated_at', 'updated_at'),
+                ('construct_type', 'construct_type'),  # Original type
+            ])
+        keys, columns = zip(*fields)
+        return keys, operator.attrgetter(*columns)
+
+class FileIngestCache(Base):
+    """SQLAlchemy model recording the git blob of each file last ingested.
+    
+    A file whose blob SHA matches its row here has not changed since its
+    constructs were stored, so re-runs can skip parsing and embedding it.
+    """
+    __tablename__ = 'file_ingest_cache'
+    
+    repository = Column(String, primary_key=True)
+    path = Column(Text, primary_key=True)  # Relative to the repository root
+    blob_sha = Column(String, nullable=False)
+    last_ingested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    @classmethod
+    def ingested_blobs(cls, session, repository: str) -> Dict[str, str]:
+        """Return {path: blob_sha} for every file ingested from a repository."""
+        rows = session.execute(
+            select(cls.path, cls.blob_sha).where(cls.repository == repository)
+        )
+        return dict(rows.tuples().all())
+    
+    @classmethod
+    def record(cls, session, repository: str, blobs: Dict[str, str], chunk_size: int = 1000) -> None:
+        """Upsert the blob SHA of each ingested file.
+        
+        Args:
+            session: Database session
+            repository: Repository name
+            blobs: Mapping of relative path to git blob SHA
+            chunk_size: Rows per INSERT statement
+        """
+        items = list(blobs.items())
+        for start in range(0, len(items), chunk_size):
+            stmt = pg_insert(cls).values([
+                {"repository": repository, "path": path, "blob_sha": sha}
+                for path, sha in items[start:start + chunk_size]
+            ])
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[cls.repository, cls.path],
+                set_={"blob_sha": stmt.excluded.blob_sha, "last_ingested_at": func.now()}
+            ))
@@ -1,11 +1,20 @@
 """Processor registry and base classes for content processing."""
 
-from typing import Dict, Type, List
+import importlib
+from typing import Dict, Type, List, Tuple
 from .base import BaseProcessor
 
 # Registry of available processors
 _processors: Dict[str, Type[BaseProcessor]] = {}
 
+# Built-in processors as (module, class); each is imported and registered on
+# first lookup, so embd-repo never loads aiohttp/bs4 and embd-web never loads
+# tree-sitter
+_builtin_processors: Dict[str, Tuple[str, str]] = {
+    'local': ('.local', 'LocalFileProcessor'),
+    'web': ('.web', 'WebProcessor'),
+}
+
 def register_processor(name: str, processor_class: Type[BaseProcessor]) -> None:
     """Register a new processor.
     
@@ -29,6 +38,10 @@ def get_processor(name: str) -> Type[BaseProcessor]:
     Raises:
         KeyError: If no processor is registered with that name
     """
+    if name not in _processors and name in _builtin_processors:
+        module_name, class_name = _builtin_processors[name]
+        module = importlib.import_module(module_name, __name__)
+        register_processor(name, getattr(module, class_name))
     try:
         return _processors[name]
     except KeyError:
@@ -36,11 +49,4 @@ def get_processor(name: str) -> Type[BaseProcessor]:
 
 def list_processors() -> List[str]:
     """Get list of registered processor names."""
-    return list(_processors.keys())
-
-# Register built-in processors
-from .local import LocalFileProcessor
-from .web import WebProcessor
-
-register_processor('local', LocalFileProcessor)
-register_processor('web', WebProcessor)
+    return list(dict.fromkeys([*_builtin_processors, *_processors]))
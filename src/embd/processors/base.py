@@ -1,26 +1,64 @@
 """Base class for all content processors."""
 
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Optional
+from typing import Callable, List, Set, Tuple, Optional, TYPE_CHECKING
+import numpy as np
+from .. import config
 from .. import models
-from ..embedding import EmbeddingGenerator
+
+if TYPE_CHECKING:
+    from ..embedding import EmbeddingGenerator
 
 logger = logging.getLogger(__name__)
 
+# Receives batches of (CodeConstruct, embedding) tuples as they are embedded
+EmbeddedCallback = Callable[[List[Tuple[models.CodeConstruct, np.ndarray]]], None]
+
 class BaseProcessor(ABC):
     """Base class for processing content and generating embeddings."""
     
-    def __init__(self, embedding_generator: Optional[EmbeddingGenerator] = None):
+    def __init__(self, embedding_generator: Optional["EmbeddingGenerator"] = None,
+                 embed_concurrency: int = config.EMBED_CONCURRENCY,
+                 embed: bool = True):
         """Initialize processor with optional embedding generator.
-        
+
         Args:
-            embedding_generator: EmbeddingGenerator instance or None to create new one
+            embedding_generator: EmbeddingGenerator instance, or None to create
+                one the first time an embedding is needed
+            embed_concurrency: Maximum number of embedding requests in flight
+            embed: Whether to embed constructs; when False they keep their
+                empty placeholder embedding and no API calls are made
+        """
+        self._embedding_generator = embedding_generator
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.embed = embed
+        self._failed_files: Set[str] = set()
+
+    @property
+    def failed_files(self) -> Set[str]:
+        """Filenames of constructs whose embedding failed.
+        
+        Those constructs are stored with the generator's all-zero default
+        embedding, so their files should not be recorded as ingested.
         """
-        self.embedding_generator = embedding_generator or EmbeddingGenerator()
+        return set(self._failed_files)
+
+    @property
+    def embedding_generator(self) -> "EmbeddingGenerator":
+        """Embedding generator, created on first use.
         
+        Listing or parsing files never needs one, so those paths skip
+        loading the Gemini SDK.
+        """
+        if self._embedding_generator is None:
+            from ..embedding import EmbeddingGenerator
+            self._embedding_generator = EmbeddingGenerator()
+        return self._embedding_generator
+
     @abstractmethod
-    def process(self) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
+    def process(self) -> Tuple[List[Tuple[models.CodeConstruct, np.ndarray]], List[models.Import]]:
         """Process content and return code constructs with embeddings and imports.
         
         Returns:
@@ -30,7 +68,7 @@ class BaseProcessor(ABC):
         """
         pass
         
-    def _generate_embedding(self, content: str, description: str = "") -> List[float]:
+    def _generate_embedding(self, content: str, description: str = "") -> np.ndarray:
         """Generate embedding for content using configured generator.
         
         Args:
@@ -38,6 +76,51 @@ class BaseProcessor(ABC):
             description: Optional description or context
             
         Returns:
-            List[float]: Generated embedding vector
+            np.ndarray: Generated float32 embedding vector
         """
         return self.embedding_generator.generate(content, description)
+
+    def _embed_constructs(self, constructs: List[models.CodeConstruct],
+                          on_embedded: Optional[EmbeddedCallback] = None) -> List[Tuple[models.CodeConstruct, np.ndarray]]:
+        """Generate embeddings for parsed constructs in concurrent batches.
+
+        Constructs are sent ``EMBEDDING_BATCH_SIZE`` per API call, with up to
+        ``embed_concurrency`` calls in flight. Results keep the order of
+        ``constructs``.
+
+        Args:
+            constructs: Constructs whose code and description should be embedded
+            on_embedded: Optional callback receiving each batch of
+                (CodeConstruct, embedding) tuples as soon as it is ready, in
+                order, for example to start storing them before the rest are done
+
+        Returns:
+            List of (CodeConstruct, embedding) tuples
+        """
+        if not constructs:
+            return []
+        if not self.embed:
+            return [(construct, construct.embedding) for construct in constructs]
+
+        def on_batch(start: int, embeddings: List[np.ndarray]) -> None:
+            batch = constructs[start:start + len(embeddings)]
+            for construct, embedding in zip(batch, embeddings):
+                construct.embedding = embedding
+            on_embedded(list(zip(batch, embeddings)))
+
+        embeddings = asyncio.run(self.embedding_generator.generate_many(
+            [(construct.code, construct.description) for construct in constructs],
+            concurrency=self.embed_concurrency,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            on_batch=on_batch if on_embedded else None
+        ))
+
+        # Failed items come back as the generator's shared default embedding
+        default_embedding = self.embedding_generator.default_embedding
+        constructs_with_embeddings = []
+        for construct, embedding in zip(constructs, embeddings):
+            construct.embedding = embedding
+            if embedding is default_embedding:
+                self._failed_files.add(construct.filename)
+            constructs_with_embeddings.append((construct, embedding))
+        return constructs_with_embeddings
@@ -1,44 +1,348 @@
 """Local file processor for git-tracked files."""
 
 import os
+import re
+import fnmatch
 import logging
+import functools
 import subprocess
-from typing import List, Tuple, Optional, Set, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional, Set, Any, Pattern, Union, Dict, Iterable, TYPE_CHECKING
 from pathlib import Path
+import numpy as np
 from tree_sitter import Parser
-from tree_sitter_languages import get_language, get_parser
+from tree_sitter_languages import get_parser
 
-from ..embedding import EmbeddingGenerator
+if TYPE_CHECKING:
+    from ..embedding import EmbeddingGenerator
 from .. import models
 from .. import config
-from .base import BaseProcessor
-from fnmatch import fnmatch
+from .base import BaseProcessor, EmbeddedCallback
 
 logger = logging.getLogger(__name__)
 
+def _compile_patterns(patterns: List[str]) -> Pattern[str]:
+    """Combine glob patterns into one regex with the same semantics as fnmatch.
+    
+    Args:
+        patterns: Glob patterns to combine
+        
+    Returns:
+        Compiled pattern matching a path if any glob matches it
+    """
+    if not patterns:
+        return re.compile(r'(?!)')  # Matches nothing
+    return re.compile('|'.join(
+        f'(?:{fnmatch.translate(os.path.normcase(p))})' for p in patterns
+    ))
+
+_MARKDOWN_EXTENSIONS = frozenset({'.md', '.mdx', '.markdown'})
+
+# Tree-sitter language for each source extension
+_LANGUAGE_MAP = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.java': 'java',
+    '.c': 'c',
+    '.cpp': 'cpp',
+    '.go': 'go',
+    '.rs': 'rust',
+}
+
+@functools.lru_cache(maxsize=None)
+def _parser_for(lang_name: str) -> Parser:
+    """Return a tree-sitter parser for a language, created once per process.
+    
+    Parsers are not shared between threads; each parse worker process
+    builds its own cache.
+    """
+    return get_parser(lang_name)
+
+ParseResult = Tuple[List[models.CodeConstruct], List[models.Import]]
+
+def parse_file(file_path: str, repository: str = "", git_commit: str = "HEAD") -> ParseResult:
+    """Parse a single file into constructs and imports without embeddings.
+    
+    This is a module-level function so it can be run in worker processes.
+    
+    Args:
+        file_path: Path to file to parse
+        repository: Repository name recorded on every construct and import
+        git_commit: Commit hash recorded on every construct and import
+        
+    Returns:
+        Tuple containing:
+        - List of CodeConstruct objects with empty embeddings
+        - List of Import objects
+    """
+    # One extension lookup decides how the whole file is handled
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in _MARKDOWN_EXTENSIONS:
+        return _parse_markdown(file_path, repository, git_commit)
+    return _parse_code_file(file_path, repository, git_commit, _LANGUAGE_MAP.get(ext))
+
+def _parse_file_safe(file_path: str, repository: str, git_commit: str) -> Union[ParseResult, Exception]:
+    """Parse a file, returning the exception instead of raising it."""
+    try:
+        return parse_file(file_path, repository, git_commit)
+    except Exception as e:
+        return e
+
+def _parse_markdown(file_path: str, repository: str, git_commit: str) -> ParseResult:
+    """Extract code blocks with language tags from a markdown file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+            
+        constructs = []
+        current_block = []
+        current_language = None
+        in_code_block = False
+        line_num = 0
+        block_start = 0
+        
+        for line in content.splitlines():
+            line_num += 1
+            if line.startswith('```'):
+                if in_code_block:
+                    # End of code block
+                    if current_block and current_language:
+                        constructs.append(models.CodeConstruct(
+                            name=f"{os.path.basename(file_path)}_{current_language}_block",
+                            construct_type="markdown_code_block",
+                            filename=file_path,
+                            code='\n'.join(current_block),
+                            description=f"Code block in {current_language} from {os.path.basename(file_path)}",
+                            repository=repository,
+                            git_commit=git_commit,
+                            embedding=[],
+                            line_start=block_start,
+                            line_end=line_num
+                        ))
+                        
+                    current_block = []
+                    current_language = None
+                    in_code_block = False
+                else:
+                    # Start of code block
+                    language = line[3:].strip()  # Get language after ```
+                    if language:
+                        current_language = language
+                        in_code_block = True
+                        block_start = line_num
+            elif in_code_block:
+                current_block.append(line)
+        
+        return constructs, []  # Markdown files don't have imports
+        
+    except Exception as e:
+        logger.error(f"Error processing markdown file {file_path}: {e}")
+        return [], []
+
+def _line_count(content: str) -> int:
+    """Count lines like len(content.splitlines()) for newline-terminated text, without building the list."""
+    if not content:
+        return 0
+    return content.count('\n') + (not content.endswith('\n'))
+
+def _text_file_construct(file_path: str, content: str, repository: str, git_commit: str) -> models.CodeConstruct:
+    """Build the construct for a file that is indexed as plain text."""
+    return models.CodeConstruct(
+        name=os.path.basename(file_path),
+        construct_type="text_file",
+        filename=file_path,
+        code=content,
+        description=f"Text file: {os.path.basename(file_path)}",
+        repository=repository,
+        git_commit=git_commit,
+        embedding=[],
+        line_start=1,
+        line_end=_line_count(content)
+    )
+
+def _parse_code_file(file_path: str, repository: str, git_commit: str,
+                     lang_name: Optional[str]) -> ParseResult:
+    """Parse a code file with tree-sitter, or as plain text when lang_name is None."""
+    # Read file content; unreadable files are reported by the caller
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+        
+    try:
+        if not lang_name:
+            logger.warning(f"Unsupported file type: {file_path}, processing as plain text")
+            return [_text_file_construct(file_path, content, repository, git_commit)], []
+        
+        constructs = []
+        imports = []
+        
+        logger.info(f"Processing {lang_name} file: {file_path}")
+        
+        source = content.encode()
+        tree = _parser_for(lang_name).parse(source)
+        if not tree or not tree.root_node:
+            raise ValueError("Failed to parse file")
+        logger.debug(f"AST root type: {tree.root_node.type}, {len(tree.root_node.children)} top-level nodes")
+        
+        # The root node ends where the file does, so the parser has already
+        # counted its lines; only rescan the text if a grammar stops short
+        end_row, end_column = tree.root_node.end_point
+        if tree.root_node.end_byte == len(source):
+            line_count = end_row + (end_column > 0)
+        else:
+            line_count = _line_count(content)
+        
+        # First, process the whole file as a reference construct
+        constructs.append(models.CodeConstruct(
+            name=os.path.basename(file_path),
+            construct_type="source_file",
+            filename=file_path,
+            code=content,
+            description=f"Complete {lang_name} file: {os.path.basename(file_path)}",
+            repository=repository,
+            git_commit=git_commit,
+            embedding=[],
+            line_start=1,
+            line_end=line_count
+        ))
+        
+        if lang_name == 'python':
+            # Find import statements
+            for node in tree.root_node.children:
+                if node.type in ['import_statement', 'import_from_statement']:
+                    import_text = content[node.start_byte:node.end_byte]
+                    
+                    # Parse the import statement
+                    is_from = import_text.startswith('from')
+                    parts = import_text.split()
+                    if is_from and len(parts) >= 4:  # from module import name
+                        module_name = parts[1]
+                        import_type = "from-import"
+                    elif not is_from and len(parts) >= 2:  # import module
+                        module_name = parts[1].split('.')[0]  # Get root module
+                        import_type = "import"
+                    else:
+                        continue
+                        
+                    imports.append(models.Import(
+                        filename=file_path,
+                        repository=repository,
+                        module_name=module_name,
+                        import_type=import_type,
+                        line_start=node.start_point[0] + 1,
+                        line_end=node.end_point[0] + 1,
+                        git_commit=git_commit
+                    ))
+            
+            # Process classes, their methods and top-level functions
+            for node in tree.root_node.children:
+                if node.type == 'class_definition':
+                    name_node = node.child_by_field_name('name')
+                    if not name_node:
+                        continue
+                        
+                    class_name = content[name_node.start_byte:name_node.end_byte]
+                    constructs.append(models.CodeConstruct(
+                        name=class_name,
+                        construct_type="class",
+                        filename=file_path,
+                        code=content[node.start_byte:node.end_byte],
+                        description=f"Class {class_name} in {os.path.basename(file_path)}",
+                        repository=repository,
+                        git_commit=git_commit,
+                        embedding=[],
+                        line_start=node.start_point[0] + 1,
+                        line_end=node.end_point[0] + 1
+                    ))
+                    
+                    # Process methods within the class
+                    body_node = node.child_by_field_name('body')
+                    if body_node:
+                        for child in body_node.children:
+                            if child.type != 'function_definition':
+                                continue
+                            method_name_node = child.child_by_field_name('name')
+                            if not method_name_node:
+                                continue
+                                
+                            method_name = f"{class_name}.{content[method_name_node.start_byte:method_name_node.end_byte]}"
+                            constructs.append(models.CodeConstruct(
+                                name=method_name,
+                                construct_type="method",
+                                filename=file_path,
+                                code=content[child.start_byte:child.end_byte],
+                                description=f"Method {method_name} in {os.path.basename(file_path)}",
+                                repository=repository,
+                                git_commit=git_commit,
+                                embedding=[],
+                                line_start=child.start_point[0] + 1,
+                                line_end=child.end_point[0] + 1
+                            ))
+                
+                elif node.type == 'function_definition':
+                    # Top-level function
+                    name_node = node.child_by_field_name('name')
+                    if not name_node:
+                        continue
+                        
+                    func_name = content[name_node.start_byte:name_node.end_byte]
+                    constructs.append(models.CodeConstruct(
+                        name=func_name,
+                        construct_type="function",
+                        filename=file_path,
+                        code=content[node.start_byte:node.end_byte],
+                        description=f"Function {func_name} in {os.path.basename(file_path)}",
+                        repository=repository,
+                        git_commit=git_commit,
+                        embedding=[],
+                        line_start=node.start_point[0] + 1,
+                        line_end=node.end_point[0] + 1
+                    ))
+        
+        return constructs, imports
+            
+    except Exception as e:
+        logger.error(f"Error processing code file {file_path}: {e}")
+        logger.exception(e)
+        # Return at least the file construct even if tree-sitter parsing fails
+        return [_text_file_construct(file_path, content, repository, git_commit)], []
+
 class LocalFileProcessor(BaseProcessor):
     """Processes local files that are tracked by git."""
     
     def __init__(self, 
                 repo_path: str, 
-                embedding_generator: Optional[EmbeddingGenerator] = None,
+                embedding_generator: Optional["EmbeddingGenerator"] = None,
+                repository: str = "",
                 include_patterns: Optional[List[str]] = None,
-                exclude_patterns: Optional[List[str]] = None):
+                exclude_patterns: Optional[List[str]] = None,
+                workers: int = config.PARSE_WORKERS,
+                embed_concurrency: int = config.EMBED_CONCURRENCY,
+                embed: bool = True):
         """Initialize processor.
         
         Args:
             repo_path: Path to git repository
             embedding_generator: Optional embedding generator instance
+            repository: Repository name recorded on every construct and import
             include_patterns: List of glob patterns for files to include
             exclude_patterns: List of glob patterns for files to exclude
+            workers: Number of processes used to parse files
+            embed_concurrency: Maximum number of embedding requests in flight
+            embed: Whether to embed constructs (False only parses them)
         """
-        super().__init__(embedding_generator)
+        super().__init__(embedding_generator, embed_concurrency, embed)
         self.repo_path = os.path.abspath(repo_path)
+        self.repository = repository
+        self.workers = max(1, workers)
         self._processed_files: Set[str] = set()
+        self._tracked_files: Optional[List[str]] = None
         
         # Initialize patterns
         self.include_patterns = include_patterns or config.DEFAULT_INCLUDE_PATTERNS
         self.exclude_patterns = exclude_patterns or config.DEFAULT_EXCLUDE_PATTERNS
+        self._include_re = _compile_patterns(self.include_patterns)
+        self._exclude_re = _compile_patterns(self.exclude_patterns)
         
         # Get current commit hash
         try:
@@ -54,6 +358,18 @@ class LocalFileProcessor(BaseProcessor):
             self.current_commit = "HEAD"
             logger.warning("Could not determine current git commit hash")
         
+    def relative_path(self, file_path: str) -> str:
+        """Return a file's path relative to the repository root.
+        
+        Tracked paths are built by joining the root with git's relative
+        path, so the root prefix is sliced off rather than normalizing both
+        paths with os.path.relpath for every file.
+        """
+        prefix = os.path.join(self.repo_path, '')
+        if file_path.startswith(prefix):
+            return file_path[len(prefix):]
+        return os.path.relpath(file_path, self.repo_path)
+
     def should_process_file(self, file_path: str) -> bool:
         """Check if a file should be processed based on include/exclude patterns.
         
@@ -64,19 +380,12 @@ class LocalFileProcessor(BaseProcessor):
             bool: True if the file should be processed
         """
         # Convert to relative path for pattern matching
-        rel_path = os.path.relpath(file_path, self.repo_path)
-        
-        # Check exclude patterns first
-        for pattern in self.exclude_patterns:
-            if fnmatch(rel_path, pattern):
-                return False
-        
-        # Then check include patterns
-        for pattern in self.include_patterns:
-            if fnmatch(rel_path, pattern):
-                return True
+        rel_path = os.path.normcase(self.relative_path(file_path))
         
-        return False
+        # Exclude patterns take precedence over include patterns
+        if self._exclude_re.match(rel_path):
+            return False
+        return self._include_re.match(rel_path) is not None
 
     def list_processable_files(self) -> List[tuple[str, str]]:
         """List all files that would be processed based on current patterns.
@@ -89,462 +398,161 @@ class LocalFileProcessor(BaseProcessor):
         
         for file_path in tracked_files:
             if self.should_process_file(file_path):
-                rel_path = os.path.relpath(file_path, self.repo_path)
+                rel_path = self.relative_path(file_path)
                 processable.append((file_path, rel_path))
         
         return processable
 
     def get_tracked_files(self) -> List[str]:
-        """Get list of git tracked files in the repository."""
+        """Get list of git tracked files in the repository.
+        
+        The listing comes from a single ``git ls-files -z`` call and is
+        cached for the lifetime of the processor.
+        """
+        if self._tracked_files is not None:
+            return self._tracked_files
         try:
             result = subprocess.run(
-                ['git', 'ls-files'],
-                cwd=self.repo_path,
+                ['git', '-C', self.repo_path, 'ls-files', '-z'],
                 capture_output=True,
-                text=True,
                 check=True
             )
-            return [os.path.join(self.repo_path, f.strip()) 
-                   for f in result.stdout.splitlines() if f.strip()]
         except subprocess.CalledProcessError as e:
             logger.error(f"Error getting tracked files: {e}")
             return []
+        # NUL-separated output keeps unusual file names intact
+        self._tracked_files = [
+            os.path.join(self.repo_path, os.fsdecode(f))
+            for f in result.stdout.split(b'\0') if f
+        ]
+        return self._tracked_files
+
+    def get_tracked_blobs(self) -> Dict[str, str]:
+        """Map tracked files to their git blob SHA.
+        
+        Files with unstaged changes are left out, since their index SHA no
+        longer describes the content on disk.
+        
+        Returns:
+            Dict of relative path to blob SHA
+        """
+        try:
+            staged = subprocess.run(
+                ['git', '-C', self.repo_path, 'ls-files', '-s', '-z'],
+                capture_output=True,
+                check=True
+            ).stdout
+            modified = subprocess.run(
+                ['git', '-C', self.repo_path, 'ls-files', '-m', '-z'],
+                capture_output=True,
+                check=True
+            ).stdout
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error getting tracked blobs: {e}")
+            return {}
+        modified_paths = {os.fsdecode(f) for f in modified.split(b'\0') if f}
+        blobs = {}
+        # Each entry is "<mode> <sha> <stage>\t<path>"
+        for entry in staged.split(b'\0'):
+            if not entry:
+                continue
+            meta, _, path = entry.partition(b'\t')
+            rel_path = os.fsdecode(path)
+            if rel_path not in modified_paths:
+                blobs[rel_path] = meta.split()[1].decode()
+        return blobs
+    
+    def skip_files(self, rel_paths: Iterable[str]) -> None:
+        """Mark files as already processed so process() leaves them out.
+        
+        Args:
+            rel_paths: Paths relative to the repository root
+        """
+        self._processed_files.update(os.path.join(self.repo_path, p) for p in rel_paths)
+    
+    @property
+    def processed_files(self) -> Set[str]:
+        """Absolute paths of files processed or skipped so far."""
+        return set(self._processed_files)
             
-    def process(self) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
+            
+    def process(self, on_embedded: Optional[EmbeddedCallback] = None
+                ) -> Tuple[List[Tuple[models.CodeConstruct, np.ndarray]], List[models.Import]]:
         """Process all git-tracked files in the repository.
         
+        Files are parsed in a pool of ``workers`` processes, then the
+        resulting constructs are embedded with up to ``embed_concurrency``
+        requests in flight.
+        
+        Args:
+            on_embedded: Optional callback receiving batches of
+                (CodeConstruct, embedding) tuples as they are embedded
+        
         Returns:
             Tuple containing:
             - List of (CodeConstruct, embedding) tuples
             - List of Import objects
         """
-        constructs_with_embeddings = []
+        constructs = []
         imports = []
         
         # Get files using the same logic as list_processable_files()
         processable_files = self.list_processable_files()
         logger.info(f"Found {len(processable_files)} files to process")
         
+        pending = []
         for file_path, rel_path in processable_files:
-            logger.info(f"Processing file: {rel_path}")
-            
             if file_path in self._processed_files:
-                logger.info(f"Skipping already processed file: {rel_path}")
+                logger.debug(f"Skipping already processed file: {rel_path}")
                 continue
-                
-            try:
-                file_constructs, file_imports = self.process_file(file_path)
-                logger.info(f"Found {len(file_constructs)} constructs in {rel_path}")
-                constructs_with_embeddings.extend(file_constructs)
-                imports.extend(file_imports)
-                self._processed_files.add(file_path)
-            except Exception as e:
-                logger.error(f"Error processing {rel_path}: {e}")
+            pending.append((file_path, rel_path))
+        
+        # Stage 1: parse (CPU bound)
+        for (file_path, rel_path), result in zip(pending, self._parse_files([f for f, _ in pending])):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing {rel_path}: {result}")
+                continue
+            file_constructs, file_imports = result
+            logger.info(f"Found {len(file_constructs)} constructs in {rel_path}")
+            constructs.extend(file_constructs)
+            imports.extend(file_imports)
+            self._processed_files.add(file_path)
+        
+        # Stage 2: embed (network bound)
+        constructs_with_embeddings = self._embed_constructs(constructs, on_embedded)
                 
         logger.info(f"Processed {len(self._processed_files)} files total")
         logger.info(f"Found {len(constructs_with_embeddings)} total constructs")
-        for construct, embedding in constructs_with_embeddings:
-            logger.info(f"  Construct: {construct.name} ({construct.construct_type}) lines {construct.line_start}-{construct.line_end}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for construct, embedding in constructs_with_embeddings:
+                logger.debug(f"  Construct: {construct.name} ({construct.construct_type}) lines {construct.line_start}-{construct.line_end}")
         return constructs_with_embeddings, imports
-        
-    def process_file(self, file_path: str) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
-        """Process a single file.
-        
-        Args:
-            file_path: Path to file to process
-            
-        Returns:
-            Tuple containing:
-            - List of (CodeConstruct, embedding) tuples
-            - List of Import objects
-        """
-        if file_path.endswith(('.md', '.mdx', '.markdown')):
-            return self.process_markdown(file_path)
-        else:
-            return self.process_code_file(file_path)
-            
-    def process_markdown(self, file_path: str) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
-        """Process a markdown file to extract code blocks with language tags.
+    
+    def _parse_files(self, file_paths: List[str]) -> List[Union[ParseResult, Exception]]:
+        """Parse files, in worker processes when more than one worker is configured.
         
         Args:
-            file_path: Path to markdown file
+            file_paths: Paths of files to parse
             
         Returns:
-            Tuple containing:
-            - List of (CodeConstruct, embedding) tuples
-            - List of Import objects
+            One parse result per path, or the exception raised while parsing it
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            constructs_with_embeddings = []
-            current_block = []
-            current_language = None
-            in_code_block = False
-            line_num = 0
-            block_start = 0
-            
-            for line in content.splitlines():
-                line_num += 1
-                if line.startswith('```'):
-                    if in_code_block:
-                        # End of code block
-                        if current_block and current_language:
-                            code = '\n'.join(current_block)
-                            description = f"Code block in {current_language} from {os.path.basename(file_path)}"
-                            
-                            # Create embedding
-                            embedding = self.embedding_generator.generate(
-                                code, 
-                                description, 
-                                filename=file_path
-                            ) if self.embedding_generator else []
-                            
-                            # Create construct with proper fields
-                            construct = models.CodeConstruct(
-                                name=f"{os.path.basename(file_path)}_{current_language}_block",
-                                construct_type="markdown_code_block",
-                                filename=file_path,
-                                code=code,
-                                description=description,
-                                repository="",  # Will be set by main.py
-                                git_commit=self.current_commit,
-                                embedding=embedding,
-                                line_start=block_start,
-                                line_end=line_num
-                            )
-                            constructs_with_embeddings.append((construct, embedding))
-                            
-                        current_block = []
-                        current_language = None
-                        in_code_block = False
-                    else:
-                        # Start of code block
-                        language = line[3:].strip()  # Get language after ```
-                        if language:
-                            current_language = language
-                            in_code_block = True
-                            block_start = line_num
-                elif in_code_block:
-                    current_block.append(line)
-            
-            return constructs_with_embeddings, []  # Markdown files don't have imports
-            
-        except Exception as e:
-            logger.error(f"Error processing markdown file {file_path}: {e}")
-            return [], []
+        parse = functools.partial(_parse_file_safe, repository=self.repository, git_commit=self.current_commit)
+        if self.workers == 1 or len(file_paths) <= 1:
+            return [parse(path) for path in file_paths]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(file_paths))) as executor:
+            return list(executor.map(parse, file_paths, chunksize=8))
         
-    def process_code_file(self, file_path: str) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
-        """Process a code file using tree-sitter for parsing.
+    def process_file(self, file_path: str) -> Tuple[List[Tuple[models.CodeConstruct, np.ndarray]], List[models.Import]]:
+        """Process a single file.
         
         Args:
-            file_path: Path to code file
+            file_path: Path to file to process
             
         Returns:
             Tuple containing:
             - List of (CodeConstruct, embedding) tuples
             - List of Import objects
         """
-        try:
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                lines = content.splitlines()
-                
-            # Determine language from extension
-            ext = os.path.splitext(file_path)[1].lower()
-            language_map = {
-                '.py': 'python',
-                '.js': 'javascript',
-                '.ts': 'typescript',
-                '.java': 'java',
-                '.c': 'c',
-                '.cpp': 'cpp',
-                '.go': 'go',
-                '.rs': 'rust',
-            }
-            lang_name = language_map.get(ext)
-            logger.info(f"DETECTED LANGUAGE: {lang_name} for extension {ext}")
-            if not lang_name:
-                logger.warning(f"Unsupported file type: {ext}, processing as plain text")
-                return self._process_text_file(file_path, content, lines)
-            
-            constructs_with_embeddings = []
-            imports = []
-            
-            logger.info("ABOUT TO START TREE-SITTER PROCESSING")
-            
-            # Initialize tree-sitter parser
-            logger.info(f"Processing {lang_name} file: {file_path}")
-            
-            language = get_language(lang_name)
-            parser = Parser()
-            parser.set_language(language)
-            
-            tree = parser.parse(content.encode())
-            if not tree or not tree.root_node:
-                raise ValueError("Failed to parse file")
-            logger.info("Successfully parsed file with tree-sitter")
-            
-            # Debug the tree structure
-            logger.info(f"AST root type: {tree.root_node.type}")
-            logger.info(f"Number of top-level nodes: {len(tree.root_node.children)}")
-            for child in tree.root_node.children:
-                logger.info(f"Top-level node: {child.type}")
-                if child.type == 'class_definition':
-                    name_node = child.child_by_field_name('name')
-                    if name_node:
-                        name = content[name_node.start_byte:name_node.end_byte]
-                        logger.info(f"Found class: {name}")
-                elif child.type == 'function_definition':
-                    name_node = child.child_by_field_name('name')
-                    if name_node:
-                        name = content[name_node.start_byte:name_node.end_byte]
-                        logger.info(f"Found function: {name}")
-            
-            # First, process the whole file as a reference construct
-            description = f"Complete {lang_name} file: {os.path.basename(file_path)}"
-            try:
-                file_embedding = self.embedding_generator.generate(
-                    content, 
-                    description,
-                    filename=file_path
-                ) if self.embedding_generator else []
-            except Exception as e:
-                logger.error(f"Failed to generate embedding for file {file_path}: {e}")
-                file_embedding = []
-            
-            file_construct = models.CodeConstruct(
-                name=os.path.basename(file_path),
-                construct_type="source_file",
-                filename=file_path,
-                code=content,
-                description=description,
-                repository="",  # Will be set by main.py
-                git_commit=self.current_commit,
-                embedding=file_embedding,
-                line_start=1,
-                line_end=len(lines)
-            )
-            constructs_with_embeddings.append((file_construct, file_embedding))
-            
-            # Process imports for Python
-            if lang_name == 'python':
-                logger.info("PROCESSING PYTHON IMPORTS")
-                # Find import statements
-                for node in tree.root_node.children:
-                    if node.type in ['import_statement', 'import_from_statement']:
-                        import_text = content[node.start_byte:node.end_byte]
-                        line_start = node.start_point[0] + 1
-                        line_end = node.end_point[0] + 1
-                        
-                        # Parse the import statement
-                        is_from = import_text.startswith('from')
-                        parts = import_text.split()
-                        if is_from and len(parts) >= 4:  # from module import name
-                            module_name = parts[1]
-                            import_type = "from-import"
-                        elif not is_from and len(parts) >= 2:  # import module
-                            module_name = parts[1].split('.')[0]  # Get root module
-                            import_type = "import"
-                        else:
-                            continue
-                            
-                        imports.append(models.Import(
-                            filename=file_path,
-                            repository="",  # Will be set by main.py
-                            module_name=module_name,
-                            import_type=import_type,
-                            line_start=line_start,
-                            line_end=line_end,
-                            git_commit=self.current_commit
-                        ))
-            
-            # Process classes and functions
-            if lang_name == 'python':
-                logger.info("PROCESSING PYTHON CLASSES AND FUNCTIONS")
-                logger.debug("Starting to process Python constructs")
-                # Process all nodes recursively
-                def process_nodes(nodes, parent_class=None):
-                    logger.debug(f"Processing {len(nodes)} nodes")
-                    for i, node in enumerate(nodes):
-                        logger.debug(f"Processing node {i}: {node.type}")
-                        if node.type == 'class_definition':
-                            logger.debug("Found class definition")
-                            name_node = node.child_by_field_name('name')
-                            if not name_node:
-                                logger.debug("Class has no name node, skipping")
-                                continue
-                                
-                            class_name = content[name_node.start_byte:name_node.end_byte]
-                            logger.debug(f"Processing class: {class_name}")
-                            class_code = content[node.start_byte:node.end_byte]
-                            line_start = node.start_point[0] + 1
-                            line_end = node.end_point[0] + 1
-                            
-                            description = f"Class {class_name} in {os.path.basename(file_path)}"
-                            
-                            # Generate embedding for the class
-                            logger.debug(f"Generating embedding for class {class_name}")
-                            try:
-                                embedding = self.embedding_generator.generate(
-                                    class_code,
-                                    description,
-                                    filename=file_path
-                                ) if self.embedding_generator else []
-                            except Exception as e:
-                                logger.error(f"Failed to generate embedding for class {class_name}: {e}")
-                                embedding = []
-                            
-                            construct = models.CodeConstruct(
-                                name=class_name,
-                                construct_type="class",
-                                filename=file_path,
-                                code=class_code,
-                                description=description,
-                                repository="",  # Will be set by main.py
-                                git_commit=self.current_commit,
-                                embedding=embedding,
-                                line_start=line_start,
-                                line_end=line_end
-                            )
-                            logger.debug(f"Adding class construct: {class_name}")
-                            constructs_with_embeddings.append((construct, embedding))
-                            
-                            # Process methods within the class
-                            body_node = node.child_by_field_name('body')
-                            if body_node:
-                                for child in body_node.children:
-                                    if child.type == 'function_definition':
-                                        method_name_node = child.child_by_field_name('name')
-                                        if not method_name_node:
-                                            continue
-                                            
-                                        method_name = f"{class_name}.{content[method_name_node.start_byte:method_name_node.end_byte]}"
-                                        method_code = content[child.start_byte:child.end_byte]
-                                        method_line_start = child.start_point[0] + 1
-                                        method_line_end = child.end_point[0] + 1
-                                        
-                                        description = f"Method {method_name} in {os.path.basename(file_path)}"
-                                        
-                                        # Generate embedding for the method
-                                        try:
-                                            embedding = self.embedding_generator.generate(
-                                                method_code,
-                                                description,
-                                                filename=file_path
-                                            ) if self.embedding_generator else []
-                                        except Exception as e:
-                                            logger.error(f"Failed to generate embedding for method {method_name}: {e}")
-                                            embedding = []
-                                        
-                                        construct = models.CodeConstruct(
-                                            name=method_name,
-                                            construct_type="method",
-                                            filename=file_path,
-                                            code=method_code,
-                                            description=description,
-                                            repository="",  # Will be set by main.py
-                                            git_commit=self.current_commit,
-                                            embedding=embedding,
-                                            line_start=method_line_start,
-                                            line_end=method_line_end
-                                        )
-                                        constructs_with_embeddings.append((construct, embedding))
-                        
-                        elif node.type == 'function_definition' and not parent_class:
-                            # Top-level function
-                            name_node = node.child_by_field_name('name')
-                            if not name_node:
-                                continue
-                                
-                            func_name = content[name_node.start_byte:name_node.end_byte]
-                            func_code = content[node.start_byte:node.end_byte]
-                            line_start = node.start_point[0] + 1
-                            line_end = node.end_point[0] + 1
-                            
-                            description = f"Function {func_name} in {os.path.basename(file_path)}"
-                            
-                            # Generate embedding for the function
-                            try:
-                                embedding = self.embedding_generator.generate(
-                                    func_code,
-                                    description,
-                                    filename=file_path
-                                ) if self.embedding_generator else []
-                            except Exception as e:
-                                logger.error(f"Failed to generate embedding for function {func_name}: {e}")
-                                embedding = []
-                            
-                            construct = models.CodeConstruct(
-                                name=func_name,
-                                construct_type="function",
-                                filename=file_path,
-                                code=func_code,
-                                description=description,
-                                repository="",  # Will be set by main.py
-                                git_commit=self.current_commit,
-                                embedding=embedding,
-                                line_start=line_start,
-                                line_end=line_end
-                            )
-                            constructs_with_embeddings.append((construct, embedding))
-                
-                # Process all top-level nodes
-                logger.debug("Starting to process top-level nodes")
-                process_nodes(tree.root_node.children)
-                logger.debug(f"Finished processing. Total constructs: {len(constructs_with_embeddings)}")
-            
-            return constructs_with_embeddings, imports
-                
-        except Exception as e:
-            logger.error(f"Error processing code file {file_path}: {e}")
-            logger.exception(e)
-            # Return at least the file construct even if tree-sitter parsing fails
-            description = f"Text file: {os.path.basename(file_path)}"
-            embedding = self.embedding_generator.generate(
-                content,
-                description,
-                filename=file_path
-            ) if self.embedding_generator else []
-            
-            construct = models.CodeConstruct(
-                name=os.path.basename(file_path),
-                construct_type="text_file",
-                filename=file_path,
-                code=content,
-                description=description,
-                repository="",  # Will be set by main.py
-                git_commit=self.current_commit,
-                embedding=embedding,
-                line_start=1,
-                line_end=len(lines)
-            )
-            return [(construct, embedding)], []
-            
-    def _process_text_file(self, file_path: str, content: str, lines: List[str]) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
-        """Process a file as plain text when tree-sitter parsing fails."""
-        constructs_with_embeddings = []
-        
-        description = f"Text file: {os.path.basename(file_path)}"
-        embedding = self.embedding_generator.generate(
-            content,
-            description,
-            filename=file_path
-        ) if self.embedding_generator else []
-        
-        construct = models.CodeConstruct(
-            name=os.path.basename(file_path),
-            construct_type="text_file",
-            filename=file_path,
-            code=content,
-            description=description,
-            repository="",  # Will be set by main.py
-            git_commit=self.current_commit,
-            embedding=embedding,
-            line_start=1,
-            line_end=len(lines)
-        )
-        constructs_with_embeddings.append((construct, embedding))
-        return constructs_with_embeddings, []
+        constructs, imports = parse_file(file_path, self.repository, self.current_commit)
+        return self._embed_constructs(constructs), imports
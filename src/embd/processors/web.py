@@ -1,44 +1,102 @@
 """Web content processor for fetching and processing web documents."""
 
+import functools
 import logging
 import asyncio
 import aiohttp
-from typing import List, Tuple, Optional, Dict, Any, cast
+from typing import List, Tuple, Optional, Dict, Any, Sequence, Union, cast, TYPE_CHECKING
+import numpy as np
 from bs4 import BeautifulSoup, Tag
 from bs4.element import NavigableString
 from urllib.parse import urlparse
 
-from ..embedding import EmbeddingGenerator
+if TYPE_CHECKING:
+    from ..embedding import EmbeddingGenerator
+from .. import config
 from .. import models
-from .base import BaseProcessor
+from .base import BaseProcessor, EmbeddedCallback
 
 logger = logging.getLogger(__name__)
 
+# Placeholder embedding shared by every construct until it is embedded
+_NO_EMBEDDING = np.empty(0, dtype=np.float32)
+_NO_EMBEDDING.setflags(write=False)
+
 class WebProcessor(BaseProcessor):
     """Processes web documents with proper code block handling."""
     
-    def __init__(self, url: str, embedding_generator: Optional[EmbeddingGenerator] = None):
+    def __init__(self, url: Union[str, Sequence[str]], embedding_generator: Optional["EmbeddingGenerator"] = None,
+                 embed_concurrency: int = config.EMBED_CONCURRENCY, embed: bool = True):
         """Initialize processor.
         
         Args:
-            url: URL to process
+            url: URL, or list of URLs, to process
             embedding_generator: Optional embedding generator instance
+            embed_concurrency: Maximum number of embedding requests in flight
+            embed: Whether to embed constructs (False only parses them)
         """
-        super().__init__(embedding_generator)
-        self.url = url
+        super().__init__(embedding_generator, embed_concurrency, embed)
+        self.urls = [url] if isinstance(url, str) else list(url)
+        self.url = self.urls[0]
         
-    async def fetch_content(self) -> Tuple[str, str]:
+    async def fetch_content(self, url: Optional[str] = None,
+                            session: Optional[aiohttp.ClientSession] = None) -> Tuple[str, str]:
         """Fetch content from URL.
         
+        Args:
+            url: URL to fetch, defaulting to the processor's first URL
+            session: Session to reuse; a new one is opened if not given
+        
         Returns:
             Tuple of (content, content_type)
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.url) as response:
-                response.raise_for_status()
-                content_type = response.headers.get('content-type', '').lower()
-                content = await response.text()
-                return content, content_type
+        if session is None:
+            async with aiohttp.ClientSession() as session:
+                return await self.fetch_content(url, session)
+        async with session.get(url or self.url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('content-type', '').lower()
+            content = await response.text()
+            return content, content_type
+    
+    @staticmethod
+    def _pooled_session() -> aiohttp.ClientSession:
+        """Open a session shared by all URLs.
+        
+        Connections, DNS lookups and TLS sessions are reused between
+        requests, and the connector caps how many are open at once.
+        """
+        connector = aiohttp.TCPConnector(limit=config.WEB_FETCH_CONCURRENCY,
+                                         limit_per_host=config.WEB_FETCH_PER_HOST,
+                                         ttl_dns_cache=300)
+        return aiohttp.ClientSession(connector=connector)
+    
+    async def fetch_all(self) -> List[Union[Tuple[str, str], BaseException]]:
+        """Fetch every URL concurrently over one pooled session.
+        
+        Returns:
+            (content, content_type) tuple, or the exception raised, per URL
+        """
+        async with self._pooled_session() as session:
+            return await asyncio.gather(*(self.fetch_content(url, session) for url in self.urls),
+                                        return_exceptions=True)
+    
+    async def fetch_and_parse_all(self) -> List[Union[List[models.CodeConstruct], BaseException]]:
+        """Fetch every URL concurrently and parse each page as soon as it arrives.
+        
+        Parsing runs on a worker thread, so one page is parsed while the
+        others are still downloading instead of after the slowest one.
+        
+        Returns:
+            Parsed constructs, or the exception raised while fetching, per URL
+        """
+        async def fetch_and_parse(url: str, session: aiohttp.ClientSession) -> List[models.CodeConstruct]:
+            content, content_type = await self.fetch_content(url, session)
+            return await asyncio.to_thread(self.parse_document, url, content, content_type)
+        
+        async with self._pooled_session() as session:
+            return await asyncio.gather(*(fetch_and_parse(url, session) for url in self.urls),
+                                        return_exceptions=True)
                 
     def extract_code_blocks(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
         """Extract code blocks from HTML, preserving formatting.
@@ -52,91 +110,133 @@ class WebProcessor(BaseProcessor):
         code_blocks = []
         
         for pre in soup.find_all('pre'):
-            pre_tag = cast(Tag, pre)
-            code_tag = cast(Optional[Tag], pre_tag.find('code'))
-            if code_tag is not None:
-                # Try to determine language from class
-                language = 'unknown'
-                classes = code_tag.get('class') or []
-                if classes:
-                    for cls in classes:
-                        if isinstance(cls, str):  # Ensure cls is a string
-                            if cls.startswith('language-'):
-                                language = cls[9:]  # Remove 'language-' prefix
-                                break
-                            elif cls in ['python', 'javascript', 'java', 'cpp', 'c', 
-                                       'bash', 'json', 'html', 'css']:
-                                language = cls
-                                break
-                
-                # Preserve whitespace and formatting
-                code_text = code_tag.get_text(separator='\n', strip=False)
-                code_blocks.append({
-                    'code': code_text,
-                    'language': language
-                })
+            block = self._code_block(cast(Tag, pre))
+            if block is not None:
+                code_blocks.append(block)
                 
         return code_blocks
+    
+    @staticmethod
+    def _code_block(pre_tag: Tag) -> Optional[Dict[str, str]]:
+        """Return the code and language of a <pre> element, or None without <code>."""
+        code_tag = cast(Optional[Tag], pre_tag.find('code'))
+        if code_tag is None:
+            return None
+        # Try to determine language from class
+        language = 'unknown'
+        classes = code_tag.get('class') or []
+        if classes:
+            for cls in classes:
+                if isinstance(cls, str):  # Ensure cls is a string
+                    if cls.startswith('language-'):
+                        language = cls[9:]  # Remove 'language-' prefix
+                        break
+                    elif cls in ['python', 'javascript', 'java', 'cpp', 'c', 
+                               'bash', 'json', 'html', 'css']:
+                        language = cls
+                        break
         
-    def process(self) -> Tuple[List[Tuple[models.CodeConstruct, List[float]]], List[models.Import]]:
-        """Process web document.
+        # Preserve whitespace and formatting
+        code_text = code_tag.get_text(separator='\n', strip=False)
+        return {
+            'code': code_text,
+            'language': language
+        }
         
+    def parse_document(self, url: str, content: str, content_type: str) -> List[models.CodeConstruct]:
+        """Extract code block and text constructs from a fetched document.
+        
+        Args:
+            url: URL the document was fetched from
+            content: Document body
+            content_type: Lower-cased Content-Type header
+            
         Returns:
-            Tuple containing:
-            - List of (CodeConstruct, embedding) tuples
-            - List of Import objects (empty for web documents)
+            List of CodeConstruct objects without embeddings
         """
-        content, content_type = asyncio.run(self.fetch_content())
-        constructs_with_embeddings = []
+        code_constructs = []
+        text_constructs = []
+        # Every construct from this page shares these fields. The values are
+        # built here, so pydantic validation is skipped with model_construct
+        make_construct = functools.partial(
+            models.CodeConstruct.model_construct,
+            filename=url,
+            repository='web',
+            git_commit='',
+            line_start=0,  # Web documents don't have line numbers
+            line_end=0,
+            embedding=_NO_EMBEDDING
+        )
         
         try:
             # Process based on content type
             if 'text/html' in content_type:
                 soup = BeautifulSoup(content, 'html.parser')
                 
-                # Process code blocks
-                for block in self.extract_code_blocks(soup):
-                    construct = models.CodeConstruct(
-                        filename=self.url,
-                        repository='web',
-                        git_commit='',
-                        code=block['code'],
-                        construct_type='code_block',
-                        name=f"Code Block ({block['language']})",
-                        description=f"Code block in {block['language']} from {self.url}",
-                        line_start=0,  # Web documents don't have line numbers
-                        line_end=0,
-                        embedding=[]
-                    )
-                    embedding = self._generate_embedding(block['code'], construct.description)
-                    constructs_with_embeddings.append((construct, embedding))
+                # Collect code blocks and text sections in one walk of the
+                # tree; code blocks still come first in the result
+                for element in soup.find_all(['pre', 'h1', 'h2', 'h3', 'p']):
+                    tag = cast(Tag, element)
+                    if tag.name == 'pre':
+                        block = self._code_block(tag)
+                        if block is None:
+                            continue
+                        code_constructs.append(make_construct(
+                            code=block['code'],
+                            construct_type='code_block',
+                            name=f"Code Block ({block['language']})",
+                            description=f"Code block in {block['language']} from {url}"
+                        ))
+                        continue
                     
-                # Process text content
-                for section in soup.find_all(['h1', 'h2', 'h3', 'p']):
-                    section_tag = cast(Tag, section)
-                    text = section_tag.get_text(strip=True)
-                    tag_name = section_tag.name or 'text'  # Fallback if name is None
+                    text = tag.get_text(strip=True)
+                    tag_name = tag.name or 'text'  # Fallback if name is None
                     if text:
-                        construct = models.CodeConstruct(
-                            filename=self.url,
-                            repository='web',
-                            git_commit='',
+                        text_constructs.append(make_construct(
                             code=text,
                             construct_type='text',
                             name=tag_name,
-                            description=f"{tag_name.upper()} section from {self.url}",
-                            line_start=0,
-                            line_end=0,
-                            embedding=[]
-                        )
-                        embedding = self._generate_embedding(text, construct.description)
-                        constructs_with_embeddings.append((construct, embedding))
+                            description=f"{tag_name.upper()} section from {url}"
+                        ))
                         
-            elif 'text/markdown' in content_type or self.url.endswith(('.md', '.mdx')):
+            elif 'text/markdown' in content_type or url.endswith(('.md', '.mdx')):
                 # Process markdown similarly to local markdown files
                 pass
                 
         except Exception as e:
-            logger.error(f"Error processing web document {self.url}: {e}")
+            logger.error(f"Error processing web document {url}: {e}")
+            
+        return code_constructs + text_constructs
+        
+    def process(self, on_embedded: Optional[EmbeddedCallback] = None
+                ) -> Tuple[List[Tuple[models.CodeConstruct, np.ndarray]], List[models.Import]]:
+        """Process the web documents.
+        
+        All URLs are fetched concurrently and each page is parsed as soon as
+        it arrives. A URL that fails to fetch is logged and skipped, unless
+        every URL fails, in which case the first error is raised.
+        
+        Args:
+            on_embedded: Optional callback receiving batches of
+                (CodeConstruct, embedding) tuples as they are embedded
+        
+        Returns:
+            Tuple containing:
+            - List of (CodeConstruct, embedding) tuples
+            - List of Import objects (empty for web documents)
+        """
+        parsed = asyncio.run(self.fetch_and_parse_all())
+        errors = [result for result in parsed if isinstance(result, BaseException)]
+        if errors and len(errors) == len(parsed):
+            raise errors[0]
+        
+        constructs = []
+        for url, result in zip(self.urls, parsed):
+            if isinstance(result, BaseException):
+                logger.error(f"Error fetching web document {url}: {result}")
+                continue
+            constructs.extend(result)
             
-        return constructs_with_embeddings, []  # Web documents don't have imports
+        # Embed code blocks and sections from every document together in
+        # concurrent batches instead of one request per construct
+        return self._embed_constructs(constructs, on_embedded), []  # Web documents don't have imports
@@ -0,0 +1,312 @@
+"""Tests for the database manager's bulk write helpers."""
+
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import numpy as np
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DataError
+from click.testing import CliRunner
+
+# Add the src directory to path to allow imports
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from embd.database_manager import DatabaseManager, StaleSchemaError
+from embd.cli import search
+from embd.models import CodeConstruct, CodeEmbedding
+from embd import config
+
+class TestWriteChunk(unittest.TestCase):
+    """Tests for DatabaseManager._write_chunk."""
+
+    def setUp(self):
+        """Set up a session whose savepoints behave like context managers."""
+        self.session = MagicMock()
+        self.session.get_bind.return_value.dialect.dbapi = None
+        self.written = []
+
+    def _write(self, chunk):
+        """Record the chunk, rejecting any chunk containing a bad row."""
+        if any(row[0] == "bad" for row in chunk):
+            raise DataError("COPY", {}, Exception("invalid byte sequence"))
+        self.written.extend(row[0] for row in chunk)
+
+    def test_clean_chunk_is_written_once(self):
+        """A chunk without errors is written in one call under one savepoint."""
+        rows = [("a",), ("b",), ("c",)]
+        self.assertEqual(DatabaseManager._write_chunk(self.session, self._write, rows), 3)
+        self.assertEqual(self.written, ["a", "b", "c"])
+        self.assertEqual(self.session.begin_nested.call_count, 1)
+
+    def test_bad_row_only_drops_itself(self):
+        """A rejected chunk is retried row by row and only the bad row is skipped."""
+        rows = [("a",), ("bad",), ("c",)]
+        with self.assertLogs('embd.database_manager', level='WARNING'):
+            written = DatabaseManager._write_chunk(self.session, self._write, rows)
+        self.assertEqual(written, 2)
+        self.assertEqual(self.written, ["a", "c"])
+
+    def test_other_errors_propagate(self):
+        """Errors that are not about the data are not retried."""
+        write = MagicMock(side_effect=RuntimeError("connection lost"))
+        with self.assertRaises(RuntimeError):
+            DatabaseManager._write_chunk(self.session, write, [("a",), ("b",)])
+        self.assertEqual(write.call_count, 1)
+
+class TestSchemaVersion(unittest.TestCase):
+    """Tests for the schema version checks in init_db and embd-search."""
+
+    def setUp(self):
+        """Create a manager whose table reports an outdated schema version."""
+        self.manager = DatabaseManager.__new__(DatabaseManager)
+        patcher = patch.object(DatabaseManager, 'schema_state', return_value=(True, 'embd-schema-3'))
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def test_init_db_refuses_a_stale_schema(self):
+        """An incompatible table is not extended or written to."""
+        with patch.object(DatabaseManager, 'init_indexes') as init_indexes:
+            with self.assertRaises(StaleSchemaError) as raised:
+                self.manager.init_db()
+        init_indexes.assert_not_called()
+        self.assertIn("embd-reset-db", str(raised.exception))
+
+    def test_init_db_accepts_the_current_schema(self):
+        """The current version returns without any DDL."""
+        DatabaseManager.schema_state.return_value = (True, CodeEmbedding.SCHEMA_VERSION)
+        with patch.object(DatabaseManager, 'init_indexes') as init_indexes:
+            self.manager.init_db()
+        init_indexes.assert_not_called()
+
+    def test_search_aborts_on_a_stale_schema(self):
+        """embd-search stops before embedding the query."""
+        with patch.object(DatabaseManager, '__init__', return_value=None), \
+                patch('embd.embedding.EmbeddingGenerator') as generator:
+            result = CliRunner().invoke(search.main, ['query'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("embd-reset-db", result.output)
+        generator.assert_not_called()
+
+class TestApplySetting(unittest.TestCase):
+    """Tests for DatabaseManager._apply_setting."""
+
+    def test_value_is_bound_and_rejection_is_contained(self):
+        """Values go through set_config parameters and a rejected one does not raise."""
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.console = MagicMock()
+        conn = MagicMock()
+        conn.execute.side_effect = DataError("SET", {}, Exception("invalid value"))
+        manager._apply_setting(conn, "synchronous_commit", "of'f", is_local=True)
+        stmt, params = conn.execute.call_args[0]
+        self.assertNotIn("of'f", str(stmt))
+        self.assertEqual(params, {"name": "synchronous_commit", "value": "of'f", "is_local": True})
+        conn.begin_nested.assert_called_once()
+        manager.console.print.assert_called_once()
+
+    def test_search_applies_ef_search_locally(self):
+        """Searches set hnsw.ef_search through set_config, and a rejected value does not abort them."""
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.console = MagicMock()
+        session = MagicMock()
+        session.execute.side_effect = DataError("SET", {}, Exception("out of range"))
+        manager.Session = MagicMock(return_value=MagicMock(__enter__=MagicMock(return_value=session)))
+        with patch.object(CodeEmbedding, 'similar_code', return_value=[]) as similar_code:
+            self.assertEqual(manager.search_similar_code(np.zeros(3), ef_search=5000), [])
+            manager.search_similar_code(np.zeros(3))
+        similar_code.assert_called()
+        first, second = [c[0][1] for c in session.execute.call_args_list]
+        self.assertEqual(first, {"name": "hnsw.ef_search", "value": "5000", "is_local": True})
+        self.assertEqual(second["value"], str(config.HNSW_EF_SEARCH))
+
+class TestCopyRows(unittest.TestCase):
+    """Tests for DatabaseManager._copy_rows."""
+
+    def _row(self, construct_id, code="pass"):
+        return (construct_id, "f.py", "repo", "abc", code, "function", construct_id, "",
+                np.zeros(3, dtype=np.float32), 1, 1)
+
+    def test_direct_load_copies_into_the_table_and_upserts_repeats(self):
+        """An empty table is loaded without staging; repeated ids are upserted last."""
+        manager = DatabaseManager.__new__(DatabaseManager)
+        session = MagicMock()
+        session.get_bind.return_value.dialect.dbapi = None
+        cursor = MagicMock()
+        chunks = [[self._row("a"), self._row("b")], [self._row("a", "return 1"), self._row("c")]]
+        manager._copy_rows(session, cursor, chunks, None, direct=True)
+        self.assertEqual(cursor.copy_expert.call_count, 2)
+        for call in cursor.copy_expert.call_args_list:
+            self.assertTrue(call[0][0].startswith("COPY code_embeddings ("))
+        [upsert] = [call[0][0] for call in session.execute.call_args_list]
+        params = upsert.compile(dialect=postgresql.dialect()).params
+        self.assertEqual((params["id_m0"], params["code_m0"]), ("a", "return 1"))
+
+class TestBulkUpsert(unittest.TestCase):
+    """Tests for CodeEmbedding.bulk_upsert."""
+
+    def _construct(self, name, code="pass"):
+        return CodeConstruct(
+            filename="f.py", repository="repo", git_commit="abc", code=code,
+            construct_type="function", name=name, description="", embedding=[],
+            line_start=1, line_end=1
+        )
+
+    def test_one_statement_per_batch_and_last_duplicate_wins(self):
+        """Rows are upserted batch_size at a time, keeping the last copy of an id."""
+        session = MagicMock()
+        pairs = [(self._construct(name), np.zeros(3)) for name in "abcde"]
+        pairs.append((self._construct("a", code="return 1"), np.ones(3)))
+        self.assertEqual(CodeEmbedding.bulk_upsert(session, pairs, batch_size=2), 5)
+        self.assertEqual(session.execute.call_count, 3)
+        sql = str(session.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (id) DO UPDATE", sql)
+        first = session.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()).params
+        self.assertEqual(first["code_m0"], "return 1")
+
+    def test_store_embedding_is_a_single_upsert(self):
+        """A single construct is written without selecting it first."""
+        session = MagicMock()
+        CodeEmbedding.store_embedding(session, self._construct("a"), np.zeros(3))
+        session.query.assert_not_called()
+        self.assertEqual(session.execute.call_count, 1)
+        sql = str(session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (id) DO UPDATE", sql)
+
+    def test_constructs_compare_by_value(self):
+        """Constructs holding embedding arrays can be compared with ==."""
+        construct = self._construct("a")
+        self.assertEqual(construct, construct.model_copy())
+        self.assertEqual(construct.model_copy(update={'embedding': np.ones(3, dtype=np.float32)}),
+                         construct.model_copy(update={'embedding': np.ones(3, dtype=np.float32)}))
+        self.assertNotEqual(construct, construct.model_copy(update={'embedding': np.ones(3, dtype=np.float32)}))
+        self.assertNotEqual(construct, construct.model_copy(update={'name': "b"}))
+
+    def test_construct_id_follows_field_changes(self):
+        """The primary key reflects copies and assignments made after it was read."""
+        construct = self._construct("a")
+        self.assertEqual(construct.construct_id, "repo:f.py:a:function")
+        copy = construct.model_copy(update={'repository': "other"})
+        self.assertEqual(CodeEmbedding._row(copy, np.ones(3))['id'], "other:f.py:a:function")
+        construct.name = "b"
+        self.assertEqual(construct.construct_id, "repo:f.py:b:function")
+
+    def test_embeddings_are_stored_and_searched_at_unit_length(self):
+        """Stored and query vectors are normalized and compared by inner product."""
+        row = CodeEmbedding._row(self._construct("a"), np.array([3.0, 4.0]))
+        np.testing.assert_allclose(row['embedding'], [0.6, 0.8], rtol=1e-6)
+        stmt = CodeEmbedding.similar_code_query([0.0, 2.0], min_similarity=0.5)
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        self.assertIn("<#>", str(compiled))
+        np.testing.assert_array_equal(compiled.params["query_embedding"], [0.0, 1.0])
+        self.assertEqual(compiled.params["max_distance"], -0.5)
+
+    def test_similar_code_selects_only_requested_columns(self):
+        """Embeddings and text columns are fetched only when asked for."""
+        def selected(**flags):
+            stmt = CodeEmbedding.similar_code_query([1.0, 0.0], **flags)
+            return set(stmt.selected_columns.keys())
+        default = selected(include_code=False, include_description=False)
+        self.assertFalse(default & {'embedding', 'code', 'description'})
+        self.assertIn('embedding', selected(include_embedding=True))
+        self.assertIn('embedding', selected(for_reconstruction=True))
+
+    def test_similar_code_results_rebuild_constructs(self):
+        """Reconstruction results carry every field CodeConstruct needs."""
+        construct = self._construct("a")
+        row = SimpleNamespace(id="repo:f.py:a:function", similarity=np.float16(0.9),
+                              embedding=[1.0, 0.0], created_at=None, updated_at=None,
+                              **{key: getattr(construct, key) for key in CodeEmbedding.CONSTRUCT_COLUMNS})
+        session = MagicMock()
+        session.execute.return_value.all.return_value = [row]
+        [result] = CodeEmbedding.similar_code(session, [1.0, 0.0], for_reconstruction=True)
+        self.assertIs(type(result['similarity']), float)
+        self.assertEqual(result['embedding'].dtype, np.float32)
+        self.assertEqual(result['type'], "function")
+        self.assertEqual(CodeConstruct.from_search_result(result).name, "a")
+
+    def test_similar_code_np_returns_an_embedding_matrix(self):
+        """Embeddings are decoded with numpy and returned as one float32 matrix."""
+        stmt = CodeEmbedding.similar_code_query([1.0, 0.0], include_embedding=True)
+        decode = stmt.selected_columns.embedding.type.result_processor(postgresql.dialect(), None)
+        rows = [
+            SimpleNamespace(id=name, repository="repo", filename="f.py", construct_type="function",
+                            name=name, line_start=1, line_end=1, similarity=0.9,
+                            embedding=decode("[" + ",".join([str(i)] * config.EMBEDDING_DIMENSION) + "]"))
+            for i, name in enumerate("ab")
+        ]
+        session = MagicMock()
+        session.execute.return_value.all.return_value = rows
+        records, embeddings = CodeEmbedding.similar_code_np(session, [1.0, 0.0])
+        self.assertEqual([r['name'] for r in records], ["a", "b"])
+        self.assertNotIn('embedding', records[0])
+        self.assertEqual(embeddings.shape, (2, config.EMBEDDING_DIMENSION))
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertEqual(embeddings[1, 0], 1.0)
+
+    def test_similar_code_batch_groups_results_by_query(self):
+        """Several query vectors are searched in one statement and grouped in order."""
+        rows = [
+            SimpleNamespace(idx=1, id="x", repository="repo", filename="f.py", construct_type="function",
+                            name=name, line_start=1, line_end=1, similarity=similarity)
+            for name, similarity in (("a", 0.9), ("b", 0.8))
+        ]
+        rows.append(SimpleNamespace(**{**vars(rows[0]), 'idx': 3, 'name': "c"}))
+        session = MagicMock()
+        session.execute.return_value.all.return_value = rows
+        results = CodeEmbedding.similar_code_batch(
+            session, [[1.0, 0.0], [0.0, 1.0], [2.0, 0.0]], include_code=False, include_description=False
+        )
+        self.assertEqual([[r['name'] for r in group] for group in results], [["a", "b"], [], ["c"]])
+        self.assertEqual(session.execute.call_count, 1)
+        stmt, params = session.execute.call_args[0]
+        self.assertIn("JOIN LATERAL", str(stmt.compile(dialect=postgresql.dialect())))
+        np.testing.assert_array_equal(params["query_embeddings"][2], [1.0, 0.0])
+
+class TestBackgroundStore(unittest.TestCase):
+    """Tests for DatabaseManager.background_store."""
+
+    def setUp(self):
+        """Create a manager whose bulk_store records what it consumes."""
+        self.manager = DatabaseManager.__new__(DatabaseManager)
+        self.stored = []
+        self.aborted = False
+        patcher = patch.object(DatabaseManager, 'bulk_store', side_effect=self._consume)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def _consume(self, rows):
+        """Drain rows like bulk_store, noting whether the producer aborted."""
+        try:
+            self.stored.extend(rows)
+        except RuntimeError:
+            self.aborted = True
+            raise
+
+    def test_batches_are_stored_in_order(self):
+        """Every batch handed to the writer reaches bulk_store in order."""
+        with self.manager.background_store(max_pending=1) as store:
+            for i in range(5):
+                store([(i, None), (i + 10, None)])
+        self.assertEqual([c for c, _ in self.stored], [0, 10, 1, 11, 2, 12, 3, 13, 4, 14])
+
+    def test_producer_error_aborts_the_writer(self):
+        """An error in the producer stops bulk_store before it commits."""
+        with self.assertRaises(ValueError):
+            with self.manager.background_store() as store:
+                store([(1, None)])
+                raise ValueError("embedding failed")
+        self.assertTrue(self.aborted)
+        self.assertEqual([c for c, _ in self.stored], [1])
+
+    def test_writer_error_reaches_the_producer(self):
+        """A failure inside bulk_store is re-raised when the block exits."""
+        DatabaseManager.bulk_store.side_effect = lambda rows: next(iter(rows)) and 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            with self.manager.background_store() as store:
+                store([(1, None)])
+
+if __name__ == '__main__':
+    unittest.main()
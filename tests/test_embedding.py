@@ -0,0 +1,162 @@
+"""Tests for the embedding generator."""
+
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+from unittest.mock import patch, MagicMock
+import numpy as np
+from google.genai import errors as genai_errors
+
+# Add the src directory to path to allow imports
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from embd.embedding import EmbeddingGenerator
+from embd import config
+
+class TestEmbeddingGenerator(unittest.TestCase):
+    """Tests for the EmbeddingGenerator class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        patcher = patch('google.genai.Client')
+        self.addCleanup(patcher.stop)
+        self.client = patcher.start().return_value
+        self.client.models.embed_content.side_effect = self._embed_content
+        self.generator = EmbeddingGenerator()
+
+    def _embed_content(self, model, contents, **kwargs):
+        """Return one embedding per text, filled with the text length."""
+        texts = contents if isinstance(contents, list) else [contents]
+        response = MagicMock()
+        response.embeddings = [
+            MagicMock(values=[float(len(text))] * config.EMBEDDING_DIMENSION)
+            for text in texts
+        ]
+        return response
+
+    def test_generate_caches_by_content(self):
+        """A repeated text is served from the cache without an API call."""
+        first = self.generator.generate("def foo(): pass", "Function foo")
+        second = self.generator.generate("def foo(): pass", "Function foo")
+        self.assertIs(first, second)
+        self.assertEqual(first.dtype, np.float32)
+        self.assertEqual(self.client.models.embed_content.call_count, 1)
+        self.assertEqual(self.generator.cache_hits, 1)
+
+    def test_requests_use_the_configured_model(self):
+        """The API is called with the model the cache keys are built from."""
+        self.generator.generate("def foo(): pass")
+        _, kwargs = self.client.models.embed_content.call_args
+        self.assertEqual(kwargs['model'], config.EMBEDDING_MODEL)
+
+    def test_whitespace_changes_reuse_the_embedding(self):
+        """Text differing only in whitespace is served from the cache."""
+        first = self.generator.generate("def foo():\n    return 1\n")
+        second = self.generator.generate("def foo():\n\treturn  1")
+        self.assertIs(first, second)
+        self.assertEqual(self.client.models.embed_content.call_count, 1)
+
+    def test_embeddings_persist_across_generators(self):
+        """With a cache path set, a new generator reuses stored embeddings."""
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(config, 'EMBEDDING_CACHE_PATH', os.path.join(tmp, 'cache.sqlite3')):
+            first = EmbeddingGenerator().generate("def foo(): pass")
+            self.client.models.embed_content.reset_mock()
+            second = EmbeddingGenerator().generate("def foo(): pass")
+        np.testing.assert_array_equal(first, second)
+        self.client.models.embed_content.assert_not_called()
+
+    def test_batches_read_the_store_in_one_lookup(self):
+        """Batch cache misses are looked up in the on-disk store together."""
+        items = [("a", ""), ("bb", ""), ("ccc", "")]
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(config, 'EMBEDDING_CACHE_PATH', os.path.join(tmp, 'cache.sqlite3')):
+            first = EmbeddingGenerator().generate_batch(items)
+            self.client.models.embed_content.reset_mock()
+            generator = EmbeddingGenerator()
+            with patch.object(generator._store, 'get') as get:
+                second = generator.generate_batch(items)
+            get.assert_not_called()
+        np.testing.assert_array_equal(first, second)
+        self.client.models.embed_content.assert_not_called()
+        self.assertEqual(generator.cache_hits, 3)
+
+    def test_generate_batch_sends_only_unique_misses(self):
+        """Cached and duplicate items are spliced back in order."""
+        self.generator.generate("a")
+        embeddings = self.generator.generate_batch([("a", ""), ("bb", ""), ("a", ""), ("bb", ""), ("ccc", "")])
+        self.assertEqual([int(e[0]) for e in embeddings], [1, 2, 1, 2, 3])
+        _, kwargs = self.client.models.embed_content.call_args
+        self.assertEqual(kwargs['contents'], ["bb", "ccc"])
+        self.assertEqual(self.generator.duplicates_skipped, 2)
+
+    def test_generate_batch_splits_into_parallel_calls(self):
+        """Unique items are split into batch_size calls and mapped back in order."""
+        items = [("a", ""), ("bb", ""), ("ccc", ""), ("a", ""), ("dddd", ""), ("eeeee", "")]
+        embeddings = self.generator.generate_batch(items, batch_size=2, concurrency=3)
+        self.assertEqual(embeddings.shape, (len(items), config.EMBEDDING_DIMENSION))
+        self.assertEqual([int(e[0]) for e in embeddings], [1, 2, 3, 1, 4, 5])
+        self.assertEqual(self.client.models.embed_content.call_count, 3)
+
+    def test_generate_many_batches_concurrently(self):
+        """Items are split into batches and results keep input order."""
+        items = [(str(i) * (i + 1), "") for i in range(7)]
+        embeddings = asyncio.run(self.generator.generate_many(items, concurrency=2, batch_size=3))
+        self.assertEqual([int(e[0]) for e in embeddings], [i + 1 for i in range(7)])
+        self.assertEqual(self.client.models.embed_content.call_count, 3)
+
+    def test_generate_many_batches_only_unique_misses(self):
+        """Cached items and repeats across batches do not take batch slots."""
+        self.generator.generate("a")
+        self.client.models.embed_content.reset_mock()
+        items = [("a", ""), ("bb", ""), ("ccc", ""), ("a", ""), ("bb", ""), ("dddd", "")]
+        embeddings = asyncio.run(self.generator.generate_many(items, concurrency=2, batch_size=3))
+        self.assertEqual([int(e[0]) for e in embeddings], [1, 2, 3, 1, 2, 4])
+        _, kwargs = self.client.models.embed_content.call_args
+        self.assertEqual(kwargs['contents'], ["bb", "ccc", "dddd"])
+        self.assertEqual(self.client.models.embed_content.call_count, 1)
+
+    def test_generate_many_reports_batches_in_order(self):
+        """on_batch receives each batch's start index in input order."""
+        items = [(str(i) * (i + 1), "") for i in range(7)]
+        seen = []
+        asyncio.run(self.generator.generate_many(
+            items, concurrency=3, batch_size=3,
+            on_batch=lambda start, embeddings: seen.append((start, [int(e[0]) for e in embeddings]))
+        ))
+        self.assertEqual(seen, [(0, [1, 2, 3]), (3, [4, 5, 6]), (6, [7])])
+
+    def test_rate_limited_calls_are_retried(self):
+        """A 429 response is retried before giving up on the batch."""
+        self.client.models.embed_content.side_effect = [
+            genai_errors.ClientError(429, {"error": {"message": "quota"}}),
+            self._embed_content("model", ["abc"])
+        ]
+        with patch.object(config, 'EMBEDDING_RETRY_BASE_DELAY', 0):
+            embedding = self.generator.generate("abc")
+        self.assertEqual(int(embedding[0]), 3)
+        self.assertEqual(self.client.models.embed_content.call_count, 2)
+
+    def test_rate_limited_key_fails_over_without_waiting(self):
+        """A 429 on one API key is retried straight away on the next key."""
+        clients = {}
+        with patch.object(config, 'GEMINI_API_KEYS', ['k1', 'k2']), \
+                patch('google.genai.Client', side_effect=lambda api_key: clients.setdefault(api_key, MagicMock())):
+            generator = EmbeddingGenerator()
+        clients['k1'].models.embed_content.side_effect = genai_errors.ClientError(429, {"error": {"message": "quota"}})
+        clients['k2'].models.embed_content.side_effect = self._embed_content
+        with patch.object(config, 'EMBEDDING_RETRY_BASE_DELAY', 60), patch('embd.embedding.time.sleep') as sleep:
+            embedding = generator.generate("abc")
+            generator.generate("abcd")
+        self.assertEqual(int(embedding[0]), 3)
+        sleep.assert_not_called()
+        # The cooling key is skipped for the following request too
+        self.assertEqual(clients['k1'].models.embed_content.call_count, 1)
+        self.assertEqual(clients['k2'].models.embed_content.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
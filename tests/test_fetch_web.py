@@ -6,6 +6,7 @@ import os
 import asyncio
 from unittest.mock import patch, MagicMock
 import aiohttp
+import numpy as np
 
 # Add the src directory to path to allow imports
 src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
@@ -61,11 +62,35 @@ class TestWebProcessor(unittest.TestCase):
         self.assertIsInstance(first_result, models.CodeConstruct)
         self.assertEqual(first_result.filename, self.url)
         self.assertEqual(first_result.construct_type, "web_code_block")
-        self.assertTrue(isinstance(first_embedding, list))
-        self.assertTrue(all(isinstance(x, float) for x in first_embedding))
+        self.assertTrue(isinstance(first_embedding, np.ndarray))
+        self.assertEqual(first_embedding.dtype, np.float32)
         
         # Verify imports list
         self.assertTrue(isinstance(imports, list))
-        
+
+    def test_fetch_all_shares_one_session(self):
+        """Every URL is fetched over the same session and failures are returned."""
+        sessions = []
+        def get(session, url):
+            sessions.append(session)
+            response = MagicMock()
+            response.headers = {'content-type': 'text/html'}
+            if url.endswith('missing'):
+                response.raise_for_status.side_effect = aiohttp.ClientError("404")
+            async def text():
+                return f"<p>{url}</p>"
+            response.text = text
+            context = MagicMock()
+            context.__aenter__.return_value = response
+            return context
+        processor = WebProcessor([self.url, "https://example.com/missing", "https://example.org/"],
+                                 self.embedding_gen)
+        with patch.object(aiohttp.ClientSession, 'get', autospec=True, side_effect=get):
+            results = asyncio.run(processor.fetch_all())
+        self.assertEqual(results[0], (f"<p>{self.url}</p>", 'text/html'))
+        self.assertIsInstance(results[1], aiohttp.ClientError)
+        self.assertEqual(results[2][0], "<p>https://example.org/</p>")
+        self.assertEqual(len(set(map(id, sessions))), 1)
+
 if __name__ == '__main__':
     unittest.main()
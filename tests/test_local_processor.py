@@ -0,0 +1,156 @@
+"""Tests for the local file processor."""
+
+import unittest
+import sys
+import os
+import tempfile
+from fnmatch import fnmatch
+from unittest.mock import AsyncMock, MagicMock, patch
+import numpy as np
+
+# Add the src directory to path to allow imports
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from embd.processors.local import LocalFileProcessor, parse_file
+from embd.cli.repo import RepoCLI
+from embd import config
+
+class TestLocalFileProcessor(unittest.TestCase):
+    """Tests for the LocalFileProcessor class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.repo_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.paths = [
+            'setup.py',
+            'src/embd/models.py',
+            'src/embd/templates/code_description.j2',
+            'docs/web_processor_update.md',
+            'infra/main.tf',
+            'venv/lib/site.py',
+            'src/embd/__pycache__/models.cpython-311.pyc',
+            'tests/test_local_processor.py',
+        ]
+
+    def _processor(self, include=None, exclude=None):
+        return LocalFileProcessor(
+            self.repo_path,
+            embedding_generator=MagicMock(),
+            include_patterns=include,
+            exclude_patterns=exclude
+        )
+
+    def _expected(self, include, exclude, rel_path):
+        if any(fnmatch(rel_path, p) for p in exclude):
+            return False
+        return any(fnmatch(rel_path, p) for p in include)
+
+    def test_default_patterns_match_fnmatch(self):
+        """Compiled default patterns agree with per-pattern fnmatch."""
+        processor = self._processor()
+        for rel_path in self.paths:
+            with self.subTest(path=rel_path):
+                self.assertEqual(
+                    processor.should_process_file(os.path.join(self.repo_path, rel_path)),
+                    self._expected(config.DEFAULT_INCLUDE_PATTERNS, config.DEFAULT_EXCLUDE_PATTERNS, rel_path)
+                )
+
+    def test_exclude_takes_precedence(self):
+        """A file matching both include and exclude patterns is skipped."""
+        processor = self._processor(include=['**/*.py'], exclude=['tests/**'])
+        self.assertTrue(processor.should_process_file(os.path.join(self.repo_path, 'src/embd/models.py')))
+        self.assertFalse(processor.should_process_file(os.path.join(self.repo_path, 'tests/test_local_processor.py')))
+
+    def test_tracked_files_are_cached(self):
+        """Tracked files are listed once per processor."""
+        processor = self._processor()
+        first = processor.get_tracked_files()
+        self.assertIn(os.path.join(self.repo_path, 'setup.py'), first)
+        self.assertIs(processor.get_tracked_files(), first)
+
+    def test_tracked_blobs_match_git(self):
+        """Blob SHAs come from the index and skipped files are not reprocessed."""
+        processor = self._processor()
+        blobs = processor.get_tracked_blobs()
+        self.assertLessEqual(
+            set(blobs),
+            {os.path.relpath(f, self.repo_path) for f in processor.get_tracked_files()}
+        )
+        self.assertTrue(all(len(sha) == 40 for sha in blobs.values()))
+        
+        processor.skip_files(['setup.py'])
+        self.assertIn(os.path.join(self.repo_path, 'setup.py'), processor.processed_files)
+
+    def test_parse_file_leaves_embedding_to_processor(self):
+        """Parsing yields constructs without embeddings; process_file embeds them in batches."""
+        source = "import os\n\nclass Foo:\n    def bar(self):\n        pass\n\ndef baz():\n    pass\n"
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(source)
+        self.addCleanup(os.remove, f.name)
+        
+        constructs, imports = parse_file(f.name, repository='repo', git_commit='abc')
+        self.assertEqual(
+            [(c.name, c.construct_type) for c in constructs],
+            [(os.path.basename(f.name), 'source_file'), ('Foo', 'class'), ('Foo.bar', 'method'), ('baz', 'function')]
+        )
+        self.assertTrue(all(c.embedding.size == 0 and c.repository == 'repo' for c in constructs))
+        self.assertEqual([i.module_name for i in imports], ['os'])
+        
+        generator = MagicMock()
+        generator.generate_many = AsyncMock(side_effect=lambda items, **kwargs: [
+            [float(len(code))] for code, _ in items
+        ])
+        processor = LocalFileProcessor(self.repo_path, embedding_generator=generator, embed_concurrency=4)
+        with patch.object(config, 'EMBEDDING_BATCH_SIZE', 3):
+            embedded, _ = processor.process_file(f.name)
+        _, kwargs = generator.generate_many.call_args
+        self.assertEqual((kwargs['concurrency'], kwargs['batch_size']), (4, 3))
+        for construct, embedding in embedded:
+            self.assertEqual(embedding, [float(len(construct.code))])
+            self.assertEqual(construct.embedding, embedding)
+
+    def test_no_embed_skips_the_api(self):
+        """With embed=False constructs are returned without calling the generator."""
+        generator = MagicMock()
+        processor = LocalFileProcessor(self.repo_path, embedding_generator=generator, embed=False)
+        embedded, _ = processor.process_file(os.path.join(self.repo_path, 'setup.py'))
+        self.assertTrue(embedded)
+        self.assertTrue(all(embedding.size == 0 for _, embedding in embedded))
+        generator.generate_many.assert_not_called()
+
+    def test_failed_embeddings_mark_their_files(self):
+        """Constructs left with the default embedding report their file as failed."""
+        generator = MagicMock()
+        generator.default_embedding = np.zeros(config.EMBEDDING_DIMENSION, dtype=np.float32)
+        setup_py = os.path.join(self.repo_path, 'setup.py')
+        generator.generate_many = AsyncMock(side_effect=lambda items, **kwargs: [
+            generator.default_embedding if i == 0 else np.ones(config.EMBEDDING_DIMENSION, dtype=np.float32)
+            for i in range(len(items))
+        ])
+        processor = LocalFileProcessor(self.repo_path, embedding_generator=generator)
+        processor.process_file(setup_py)
+        self.assertEqual(processor.failed_files, {setup_py})
+
+class TestRepoCLI(unittest.TestCase):
+    """Tests for RepoCLI.process_repo."""
+
+    def test_files_with_failed_embeddings_are_not_recorded(self):
+        """Only files whose constructs all embedded are marked as ingested."""
+        repo_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        processor = MagicMock()
+        processor.get_tracked_blobs.return_value = {'a.py': 'a' * 40, 'b.py': 'b' * 40}
+        processor.processed_files = {os.path.join(repo_path, 'a.py'), os.path.join(repo_path, 'b.py')}
+        processor.failed_files = {os.path.join(repo_path, 'b.py')}
+        processor.process.return_value = ([], [])
+        cli = RepoCLI()
+        cli.console = MagicMock()
+        cli._db_manager = MagicMock()
+        cli._db_manager.unchanged_files.return_value = set()
+        with patch.object(RepoCLI, 'create_processor', return_value=processor):
+            cli.process_repo('repo', path=repo_path, save=True)
+        cli._db_manager.record_ingested_files.assert_called_once_with('repo', {'a.py': 'a' * 40})
+
+if __name__ == '__main__':
+    unittest.main()